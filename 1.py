@@ -1,13 +1,17 @@
 import pygame
 
+from traffic_sim import SignalController
+
 pygame.init()
 
 screen = pygame.display.set_mode((250,800))
 running = True
-lastTimeChange = pygame.time.get_ticks()
 LightColors = ['red','yellow','green','yellow']
 LightDuration = [6000,3000,6000,3000]
 currentLightOn = 0
+# The light is one head of a deadline-driven controller, timed in pygame ticks (ms)
+controller = SignalController()
+controller.add('light', list(zip(LightColors, LightDuration)), pygame.time.get_ticks())
 emerygencyButton = pygame.Rect(60,570,80,20)
 emerygencyButtonPressed = False
 corrdinates = [(100,100),(100,180),(100,260),(100,180)]
@@ -61,28 +65,47 @@ def drawBox():
     text = font.render("EMERGENCY",True,'black')
     screen.blit(text,(emerygencyButton.x + 5 , emerygencyButton.y + 5))
         
+needsRedraw = True
+shownSeconds = None
+# Events that invalidate the window contents; other input (e.g. mouse motion) needs no repaint
+repaintEvents = (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE, pygame.WINDOWSIZECHANGED, pygame.VIDEORESIZE)
+
 while running:
+    # Sleep until the next phase deadline, countdown change or input event
     curTime = pygame.time.get_ticks()
-    elapsed = curTime - lastTimeChange
-    remaining = LightDuration[currentLightOn] - elapsed
+    remaining = controller.remaining('light', curTime)
+    wakeTimes = [curTime + remaining % 1000 + 1] if remaining > 0 else []
+    if controller.next_deadline() is not None:
+        wakeTimes.append(controller.next_deadline())
+    timeout = max(1, min(wakeTimes) - curTime) if wakeTimes else 0  # 0 waits for an event
+    events = [pygame.event.wait(timeout)] + pygame.event.get()
 
-    for event in pygame.event.get():
+    curTime = pygame.time.get_ticks()
+    for event in events:
         if event.type == pygame.QUIT:
             running = False
         elif event.type == pygame.MOUSEBUTTONDOWN:
             if emerygencyButton.collidepoint(event.pos):
                 emerygencyButtonPressed = not emerygencyButtonPressed
                 if emerygencyButtonPressed:
-                    currentLightOn = 0
-                lastTimeChange = pygame.time.get_ticks()
-                elapsed = 0
-                remaining = LightDuration[currentLightOn]
-
-    if not emerygencyButtonPressed :
-        if elapsed >= LightDuration[currentLightOn]:
-            currentLightOn =( currentLightOn + 1) % len(LightColors)
-            lastTimeChange = curTime
-            remaining = LightDuration[currentLightOn]
+                    controller.override('light', 0, curTime)
+                else:
+                    controller.release('light', curTime)
+                needsRedraw = True
+        elif event.type in repaintEvents:
+            needsRedraw = True
+
+    if controller.advance(curTime):
+        needsRedraw = True
+    currentLightOn = controller.heads['light'].index
+    remaining = controller.remaining('light', curTime)
+    if max(0, remaining // 1000) != shownSeconds:
+        shownSeconds = max(0, remaining // 1000)
+        needsRedraw = True
+
+    if not needsRedraw:
+        continue
+    needsRedraw = False
 
     screen.fill('black')
 
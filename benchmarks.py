@@ -0,0 +1,161 @@
+"""Benchmark suite for the simulation and render hot paths.
+
+Loads an Intersection with a fixed, seeded vehicle population and measures
+the wall time per call of update(), update_vehicles(), draw_roads(),
+draw_ui() and draw_vehicles() (per vehicle drawn; vehicles outside the
+viewport are culled and not counted). Drawing goes to an offscreen surface,
+so the suite runs on a headless machine.
+
+Usage:
+    python benchmarks.py --save baseline.json
+    python benchmarks.py --compare baseline.json --threshold 0.10
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Offscreen only, no window needed
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+import pygame
+
+from traffic_sim import Intersection, Vehicle, WIDTH, HEIGHT
+from traffic_visualiser import IntersectionRenderer
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+VEHICLE_SPACING = 80  # Distance between vehicle centers when populating a lane
+
+
+def populate(intersection, count, seed=0):
+    """Fills the intersection with `count` vehicles spread evenly over all lanes.
+
+    Each lane is filled from just past the junction backwards (upstream), so
+    large populations extend off-screen like a long queue. Types and speeds
+    are drawn from a generator seeded with `seed`, so the load is repeatable.
+    """
+    rng = random.Random(seed)
+    lanes = [g for d in intersection.signal_cycle for g in intersection.lane_geometry[d]]
+    types, weights = list(intersection.type_weights), list(intersection.type_weights.values())
+    for i in range(count):
+        geometry = lanes[i % len(lanes)]
+        v = Vehicle(intersection.vehicle_id_counter, geometry, rng.choices(types, weights)[0], rng)
+        v.pos = geometry.pass_pos + 300 - (i // len(lanes)) * VEHICLE_SPACING
+        v.speed = rng.uniform(0, v.max_speed)
+        v.passed = v.pos > geometry.pass_pos
+        intersection.add_vehicle(v)
+    return intersection
+
+
+def time_per_call(setup, call, repeat, number):
+    """Returns the best median-of-rounds wall time of call(state), in seconds.
+
+    setup() builds a fresh state for each of `repeat` rounds, and call(state)
+    is then timed `number` times in that round.
+    """
+    rounds = []
+    for _ in range(repeat):
+        state = setup()
+        samples = []
+        for _ in range(number):
+            start = time.perf_counter()
+            call(state)
+            samples.append(time.perf_counter() - start)
+        rounds.append(statistics.median(samples))
+    return min(rounds)
+
+
+def run_benchmarks(sizes, repeat=5, number=20, seed=0):
+    """Runs every benchmark at every population size; returns {name: {size: seconds}}."""
+    pygame.init()
+    surface = pygame.Surface((WIDTH, HEIGHT))
+
+    def setup(size):
+        def build():
+            intersection = populate(Intersection(seed=seed), size, seed)
+            return intersection, IntersectionRenderer(intersection), surface
+        return build
+
+    benchmarks = {
+        "update": lambda state: state[0].update(),
+        "update_vehicles": lambda state: state[0].update_vehicles(),
+        "draw_roads": lambda state: state[1].draw_roads(state[2]),
+        "draw_ui": lambda state: state[1].draw_ui(state[2]),
+        "vehicle_draw": lambda state: state[1].draw_vehicles(state[2])
+    }
+
+    results = {name: {} for name in benchmarks}
+    for size in sizes:
+        for name, call in benchmarks.items():
+            seconds = time_per_call(setup(size), call, repeat, number)
+            if name == "vehicle_draw":
+                # Reported per vehicle drawn; populate() puts most of a large load off-screen
+                _, renderer, _ = setup(size)()
+                seconds /= max(1, len(renderer.visible_vehicles()))
+            results[name][str(size)] = seconds
+    return results
+
+
+def compare(baseline, results, threshold):
+    """Returns (name, size, old, new) for every result slower than baseline by more than threshold."""
+    regressions = []
+    for name, by_size in results.items():
+        for size, new in by_size.items():
+            old = baseline.get(name, {}).get(size)
+            if old and new > old * (1 + threshold):
+                regressions.append((name, size, old, new))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    """Prints one line per benchmark and size, with the change against a baseline."""
+    print(f"{'benchmark':<16} {'vehicles':>8} {'time/call':>12} {'baseline':>12} {'change':>8}")
+    for name, by_size in results.items():
+        for size, seconds in by_size.items():
+            line = f"{name:<16} {size:>8} {seconds * 1e6:>10.1f}us"
+            old = (baseline or {}).get(name, {}).get(size)
+            if old:
+                line += f" {old * 1e6:>10.1f}us {(seconds / old - 1) * 100:>+7.1f}%"
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the simulation and render hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="vehicle populations")
+    parser.add_argument("--repeat", type=int, default=5, help="rounds per benchmark (best is kept)")
+    parser.add_argument("--number", type=int, default=20, help="timed calls per round")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="FILE", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown reported as a regression (default 0.10 = 10%%)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.repeat, args.number, args.seed)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {
+                    "python": platform.python_version(), "pygame": pygame.version.ver,
+                    "machine": platform.machine(), "seed": args.seed,
+                    "repeat": args.repeat, "number": args.number
+                },
+                "results": results
+            }, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        for name, size, old, new in regressions:
+            print(f"REGRESSION {name} @ {size} vehicles: {old * 1e6:.1f}us -> {new * 1e6:.1f}us")
+        sys.exit(1 if regressions else 0)
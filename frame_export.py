@@ -0,0 +1,153 @@
+"""Offscreen frame export with parallel PNG encoding.
+
+FrameExporter is a simulation observer that draws every `stride`-th step
+with IntersectionRenderer onto an offscreen surface and writes it as a
+numbered PNG. Frames are drawn into a small ring of RGBA surfaces whose
+pixel memory is already laid out as PNG rows, so a worker thread compresses
+straight from the locked surface buffer without copying it. zlib releases
+the GIL while it compresses, so the workers run in parallel with each other
+and with the simulation. The simulation only waits when every surface of the
+ring is still being encoded.
+
+Usage:
+    python frame_export.py frames/ --seconds 3600 --fps 10
+    ffmpeg -framerate 30 -i frames/frame_%06d.png review.mp4
+"""
+import argparse
+import os
+import queue
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from traffic_sim import Intersection, WIDTH, HEIGHT, PHYSICS_HZ, run_headless
+from traffic_visualiser import IntersectionRenderer
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_HEADER = struct.Struct(">IIBBBBB")  # width, height, bit depth, color type, compression, filter, interlace
+PNG_RGBA = 6
+FILTER_NONE = b"\x00"
+
+
+def png_chunk(tag, data):
+    """Returns a PNG chunk: length, tag, data and CRC."""
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(data, zlib.crc32(tag)))
+
+
+def write_png(path, pixels, width, height, pitch, level=6):
+    """Writes 8-bit RGBA rows from a buffer as a PNG file.
+
+    Rows are fed to zlib as slices of the buffer, so the pixels are never
+    copied; pitch is the distance between rows in bytes.
+    """
+    pixels = memoryview(pixels).cast("B")
+    compressor = zlib.compressobj(level)
+    parts = []
+    for y in range(height):
+        parts.append(compressor.compress(FILTER_NONE))
+        parts.append(compressor.compress(pixels[y * pitch:y * pitch + width * 4]))
+    parts.append(compressor.flush())
+    with open(path, "wb") as f:
+        f.write(PNG_SIGNATURE)
+        f.write(png_chunk(b"IHDR", PNG_HEADER.pack(width, height, 8, PNG_RGBA, 0, 0, 0)))
+        f.write(png_chunk(b"IDAT", b"".join(parts)))
+        f.write(png_chunk(b"IEND", b""))
+
+
+# --- FrameExporter Class ---
+class FrameExporter:
+    """Observer that renders frames offscreen and writes them as PNGs on a thread pool.
+
+    Use as an observer: run_headless(..., observers=[exporter]).
+    """
+
+    def __init__(self, directory, stride=1, size=(WIDTH, HEIGHT), workers=None, ring=None, level=6):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.stride = stride
+        self.size = size
+        self.level = level
+        workers = workers or os.cpu_count()
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="frame-encoder")
+
+        # Ring of surfaces; a frame's surface returns to the ring once it is written.
+        # Byte order R, G, B, A in memory, so a surface buffer is PNG RGBA as is.
+        masks = (0xFF, 0xFF00, 0xFF0000, 0xFF000000) if sys.byteorder == "little" else \
+                (0xFF000000, 0xFF0000, 0xFF00, 0xFF)
+        self.free = queue.Queue()
+        for _ in range(ring or workers * 2):
+            self.free.put(pygame.Surface(size, pygame.SRCALPHA, 32, masks))
+
+        self.renderer = None
+        self.frames = 0
+        self.stalled = 0.0  # Wall seconds the simulation waited for a free surface
+        self.error = None
+
+    def __call__(self, intersection):
+        """Draws the current state and queues it for encoding."""
+        if intersection.step_count % self.stride:
+            return
+        if self.error is not None:
+            raise self.error
+
+        if self.renderer is None:
+            self.renderer = IntersectionRenderer(intersection, self.size)
+        try:
+            surface = self.free.get_nowait()
+        except queue.Empty:
+            start = time.perf_counter()
+            surface = self.free.get()  # Every surface is being encoded; wait for one
+            self.stalled += time.perf_counter() - start
+
+        self.renderer.draw(surface)
+        path = os.path.join(self.directory, f"frame_{self.frames:06d}.png")
+        self.executor.submit(self.encode, path, surface)
+        self.frames += 1
+
+    def encode(self, path, surface):
+        """Worker: writes one frame and returns its surface to the ring."""
+        try:
+            buffer = surface.get_buffer()  # Locks the surface until released
+            try:
+                write_png(path, buffer, surface.get_width(), surface.get_height(), surface.get_pitch(), self.level)
+            finally:
+                del buffer
+        except Exception as e:
+            self.error = e
+        finally:
+            self.free.put(surface)
+
+    def close(self):
+        """Waits for the queued frames to be written."""
+        self.executor.shutdown(wait=True)
+        if self.error is not None:
+            raise self.error
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a headless run to numbered PNG frames")
+    parser.add_argument("directory", help="output directory for frame_000000.png, ...")
+    parser.add_argument("--seconds", type=float, default=600, help="simulated seconds to run")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--fps", type=float, default=10, help="frames per simulated second (default 10)")
+    group.add_argument("--stride", type=int, help="render every Nth physics step instead")
+    parser.add_argument("--workers", type=int, help="encoder threads (default: all cores)")
+    parser.add_argument("--ring", type=int, help="offscreen surfaces in flight (default: twice the workers)")
+    parser.add_argument("--level", type=int, default=6, help="zlib compression level 0-9")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    stride = args.stride or max(1, round(PHYSICS_HZ / args.fps))
+    exporter = FrameExporter(args.directory, stride, workers=args.workers, ring=args.ring, level=args.level)
+    start = time.perf_counter()
+    try:
+        run_headless(args.seconds, Intersection(seed=args.seed), observers=[exporter])
+    finally:
+        exporter.close()
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {exporter.frames} frames to {args.directory} in {elapsed:.1f}s "
+          f"({exporter.frames / elapsed:.1f} frames/s, simulation stalled {exporter.stalled:.1f}s)")
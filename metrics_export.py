@@ -0,0 +1,125 @@
+"""Streaming per-second metrics export.
+
+MetricsCollector is a simulation observer that, once per simulated second,
+builds a flat row of aggregates (throughput per approach, queue length per
+lane and the spawned/passed/current totals) and hands it to a MetricsWriter.
+The writer owns the file on a background thread and drains a bounded queue,
+so the simulation loop never waits on disk I/O. If the writer falls behind
+and the queue fills up, rows are dropped and counted instead of blocking.
+
+Usage:
+    python metrics_export.py metrics.csv                    # windowed run
+    python metrics_export.py metrics.jsonl --headless 3600  # headless run
+"""
+import argparse
+import csv
+import json
+import queue
+import threading
+
+from traffic_sim import Intersection, PHYSICS_HZ, run_headless
+
+
+# --- MetricsWriter Class ---
+class MetricsWriter(threading.Thread):
+    """Background thread that streams metric rows to a CSV or JSON-lines file.
+
+    The format follows the file extension: ".csv" writes CSV with a header
+    taken from the first row, anything else writes one JSON object per line.
+    """
+
+    def __init__(self, path, maxsize=1024):
+        super().__init__(name="metrics-writer", daemon=True)
+        self.path = path
+        self.rows = queue.Queue(maxsize)
+        self.dropped = 0
+        self.written = 0
+        self.start()
+
+    def submit(self, row):
+        """Queues a row without blocking; returns False if it had to be dropped."""
+        try:
+            self.rows.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def run(self):
+        """Thread body: writes rows until the close() sentinel arrives."""
+        with open(self.path, "w", newline="") as f:
+            writer = None
+            while True:
+                row = self.rows.get()
+                if row is None:
+                    break
+                if self.path.endswith(".csv"):
+                    if writer is None:
+                        writer = csv.DictWriter(f, fieldnames=list(row))
+                        writer.writeheader()
+                    writer.writerow(row)
+                else:
+                    f.write(json.dumps(row) + "\n")
+                self.written += 1
+                if self.rows.empty():
+                    f.flush()
+
+    def close(self):
+        """Writes out everything still queued and stops the thread."""
+        self.rows.put(None)
+        self.join()
+
+
+# --- MetricsCollector Class ---
+class MetricsCollector:
+    """Simulation observer that emits one row of aggregates per simulated second."""
+
+    def __init__(self, writer, interval=1.0):
+        self.writer = writer
+        self.interval_steps = max(1, round(interval * PHYSICS_HZ))
+        self.last_passed = {}
+
+    def __call__(self, intersection):
+        """Samples the intersection at the end of every interval."""
+        if intersection.step_count % self.interval_steps:
+            return
+
+        row = {
+            "time": round(intersection.sim_time, 3),
+            "spawned": intersection.total_spawned,
+            "passed": intersection.total_passed,
+            "current": sum(len(l) for d in intersection.vehicles.values() for l in d.values())
+        }
+        for d in intersection.signal_cycle:
+            passed = intersection.signals[d].vehicles_passed
+            row[f"throughput_{d}"] = passed - self.last_passed.get(d, 0)
+            self.last_passed[d] = passed
+        for d in intersection.signal_cycle:
+            for lane_id, lane in intersection.vehicles[d].items():
+                row[f"queue_{d}_{lane_id}"] = sum(1 for v in lane if v.speed < 0.1 and not v.passed)
+
+        self.writer.submit(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the simulation and stream per-second metrics")
+    parser.add_argument("path", help="output file (.csv for CSV, anything else for JSON lines)")
+    parser.add_argument("--headless", type=float, metavar="SECONDS",
+                        help="run SECONDS of simulated time without a window")
+    parser.add_argument("--interval", type=float, default=1.0, help="simulated seconds per row")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    writer = MetricsWriter(args.path)
+    collector = MetricsCollector(writer, args.interval)
+    intersection = Intersection(seed=args.seed)
+    try:
+        if args.headless is not None:
+            run_headless(args.headless, intersection, observers=[collector])
+        else:
+            from traffic_visualiser import main  # Only here, so headless runs do not need pygame
+
+            main(intersection=intersection, observers=[collector])
+    finally:
+        writer.close()
+    print(f"Wrote {writer.written} rows to {args.path} ({writer.dropped} dropped)")
@@ -0,0 +1,216 @@
+"""Grid road network of Intersection nodes.
+
+Each node of a rows x cols grid is a full Intersection. A vehicle that
+leaves a node past its off-screen removal boundary is handed to the matching
+approach lane of the neighbouring node instead of being discarded; only
+vehicles leaving the edge of the grid exit the network, and only edge
+approaches spawn new traffic.
+
+Nodes are stepped in partitions (bands of rows). With more than one
+partition each band runs in its own worker process, and partitions exchange
+only the boundary hand-offs at the end of every step.
+"""
+import argparse
+import multiprocessing
+import random
+import time
+
+from traffic_sim import Intersection, PHYSICS_HZ
+
+# Grid offset (row, col) of the node a vehicle travelling in a direction enters next
+NEIGHBOUR_OFFSETS = {"NORTH": (-1, 0), "SOUTH": (1, 0), "EAST": (0, 1), "WEST": (0, -1)}
+
+# Node ids are kept unique across the network by giving each node its own id range
+NODE_ID_STRIDE = 1 << 32
+
+
+def make_node(rows, cols, row, col):
+    """Creates the Intersection at (row, col), spawning only on edge approaches."""
+    node = Intersection()
+    node.vehicle_id_counter = (row * cols + col) * NODE_ID_STRIDE
+    node.departures = []
+    node.spawn_directions = [
+        d for d in node.signal_cycle
+        if not in_grid(rows, cols, row - NEIGHBOUR_OFFSETS[d][0], col - NEIGHBOUR_OFFSETS[d][1])
+    ]
+    return node
+
+
+def in_grid(rows, cols, row, col):
+    """Returns True if (row, col) is a node of the grid."""
+    return 0 <= row < rows and 0 <= col < cols
+
+
+# --- NetworkPartition Class ---
+class NetworkPartition:
+    """Owns and steps the nodes of a contiguous band of grid rows."""
+
+    def __init__(self, rows, cols, first_row, last_row):
+        self.rows, self.cols = rows, cols
+        self.nodes = {
+            (r, c): make_node(rows, cols, r, c)
+            for r in range(first_row, last_row) for c in range(cols)
+        }
+        # Vehicles waiting to enter a node, in arrival order
+        self.inbox = {key: [] for key in self.nodes}
+        self.total_exited = 0
+
+    def step(self, inbound, steps=1):
+        """Advances every node and returns hand-offs bound for other partitions.
+
+        inbound and the return value are lists of ((row, col), vehicle).
+        """
+        for key, v in inbound:
+            self.inbox[key].append(v)
+
+        outbound = []
+        for _ in range(steps):
+            for key, node in self.nodes.items():
+                if self.inbox[key]:
+                    self.inbox[key] = [v for v in self.inbox[key] if not node.receive_vehicle(v)]
+                node.update()
+
+            # Route vehicles that left a node to its neighbour
+            for (r, c), node in self.nodes.items():
+                for v in node.departures:
+                    dr, dc = NEIGHBOUR_OFFSETS[v.direction]
+                    target = (r + dr, c + dc)
+                    if target in self.nodes:
+                        self.inbox[target].append(v)
+                    elif in_grid(self.rows, self.cols, *target):
+                        outbound.append((target, v))
+                    else:
+                        self.total_exited += 1
+                node.departures.clear()
+        return outbound
+
+    def get_stats(self):
+        """Returns the summed counters of this partition's nodes."""
+        return {
+            "total_spawned": sum(n.total_spawned for n in self.nodes.values()),
+            "total_passed": sum(n.total_passed for n in self.nodes.values()),
+            "total_exited": self.total_exited,
+            "current": sum(n.get_stats()["current"] for n in self.nodes.values()),
+            "waiting_to_enter": sum(len(q) for q in self.inbox.values())
+        }
+
+
+def partition_worker(conn, rows, cols, first_row, last_row, seed):
+    """Worker process loop serving step/stats requests for one partition."""
+    if seed is not None:
+        random.seed(seed)
+    partition = NetworkPartition(rows, cols, first_row, last_row)
+    while True:
+        command, *args = conn.recv()
+        if command == "step":
+            conn.send(partition.step(*args))
+        elif command == "stats":
+            conn.send(partition.get_stats())
+        else:  # close
+            break
+    conn.close()
+
+
+# --- RoadNetwork Class ---
+class RoadNetwork:
+    """A rows x cols grid of intersections stepped in parallel partitions."""
+
+    def __init__(self, rows, cols, partitions=1, seed=None):
+        self.rows, self.cols = rows, cols
+        partitions = max(1, min(partitions, rows))
+        bounds = [rows * i // partitions for i in range(partitions + 1)]
+        self.row_ranges = list(zip(bounds[:-1], bounds[1:]))
+        self.pending = [[] for _ in self.row_ranges]  # Hand-offs for each partition
+        self.step_count = 0
+
+        if partitions == 1:
+            if seed is not None:
+                random.seed(seed)
+            self.local = NetworkPartition(rows, cols, 0, rows)
+            self.workers = []
+        else:
+            self.local = None
+            self.workers = []
+            for i, (first_row, last_row) in enumerate(self.row_ranges):
+                parent_conn, child_conn = multiprocessing.Pipe()
+                process = multiprocessing.Process(
+                    target=partition_worker,
+                    args=(child_conn, rows, cols, first_row, last_row, None if seed is None else seed + i),
+                    daemon=True
+                )
+                process.start()
+                self.workers.append((process, parent_conn))
+
+    def partition_of(self, row):
+        """Returns the index of the partition that owns a grid row."""
+        for i, (first_row, last_row) in enumerate(self.row_ranges):
+            if first_row <= row < last_row:
+                return i
+
+    def step(self, steps=1):
+        """Advances every node by `steps` physics steps, then exchanges hand-offs.
+
+        Cross-partition hand-offs are delivered at the end of the batch, so
+        steps > 1 trades hand-off latency for fewer exchanges.
+        """
+        inbound, self.pending = self.pending, [[] for _ in self.row_ranges]
+        if self.local is not None:
+            outbound = self.local.step(inbound[0], steps)
+        else:
+            for (_, conn), handoffs in zip(self.workers, inbound):
+                conn.send(("step", handoffs, steps))
+            outbound = [item for _, conn in self.workers for item in conn.recv()]
+
+        for (row, col), v in outbound:
+            self.pending[self.partition_of(row)].append(((row, col), v))
+        self.step_count += steps
+
+    def run(self, seconds, steps_per_exchange=1):
+        """Runs a number of simulated seconds and returns the network statistics."""
+        total_steps = int(seconds * PHYSICS_HZ)
+        while total_steps > 0:
+            steps = min(steps_per_exchange, total_steps)
+            self.step(steps)
+            total_steps -= steps
+        return self.get_stats()
+
+    def get_stats(self):
+        """Returns the network-wide counters."""
+        if self.local is not None:
+            parts = [self.local.get_stats()]
+        else:
+            for _, conn in self.workers:
+                conn.send(("stats",))
+            parts = [conn.recv() for _, conn in self.workers]
+        stats = {key: sum(p[key] for p in parts) for key in parts[0]}
+        stats["in_transit"] = sum(len(p) for p in self.pending)
+        return stats
+
+    def close(self):
+        """Stops the worker processes."""
+        for process, conn in self.workers:
+            conn.send(("close",))
+            process.join()
+        self.workers = []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless grid network simulation")
+    parser.add_argument("--rows", type=int, default=4)
+    parser.add_argument("--cols", type=int, default=4)
+    parser.add_argument("--partitions", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--seconds", type=float, default=300)
+    parser.add_argument("--steps-per-exchange", type=int, default=1)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    network = RoadNetwork(args.rows, args.cols, args.partitions, args.seed)
+    start = time.perf_counter()
+    stats = network.run(args.seconds, args.steps_per_exchange)
+    elapsed = time.perf_counter() - start
+    network.close()
+
+    print(f"{args.rows}x{args.cols} nodes, {len(network.row_ranges)} partitions: "
+          f"{args.seconds:g} simulated seconds in {elapsed:.2f}s")
+    for key, value in stats.items():
+        print(f"{key}: {value}")
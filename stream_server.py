@@ -0,0 +1,267 @@
+"""Live state streaming to local clients over TCP or a Unix socket.
+
+StateServer is a simulation observer that runs an asyncio server on its own
+thread. Every published step is encoded per client as a delta against the
+last frame that client acknowledged: only vehicles and signals whose record
+changed are sent, plus the ids of vehicles that left. A client that never
+acknowledges receives full frames (deltas against nothing).
+
+Messages are length-prefixed little-endian binary:
+
+    length  : uint32, bytes that follow
+    frame   : frame, base frame (NO_BASE for a full frame), step,
+              changed vehicle count, removed vehicle count, signal count
+    vehicle : id, type, direction, lane, color (r, g, b), x, y, speed
+    removed : id
+    signal  : direction, state, vehicles_passed, vehicles_waiting
+
+Clients acknowledge a frame by sending its number as a uint32. The
+simulation never waits on the network: the observer only hands over a
+snapshot when the server has encoded the previous one, and a client
+whose socket has not drained yet skips the frames published meanwhile;
+its next delta (against the last acknowledged frame) catches it up.
+
+Usage:
+    python stream_server.py                     # windowed run, TCP on 127.0.0.1:8765
+    python stream_server.py --unix /tmp/traffic.sock --threaded
+"""
+import argparse
+import asyncio
+import socket
+import struct
+import threading
+from collections import OrderedDict
+
+from traffic_sim import Intersection, VEHICLE_SPECS
+
+LENGTH = struct.Struct("<I")
+FRAME = struct.Struct("<IIIIIB")
+VEHICLE = struct.Struct("<QBBB3Bxxfff")
+REMOVED = struct.Struct("<Q")
+SIGNAL = struct.Struct("<BBII")
+ACK = struct.Struct("<I")
+
+NO_BASE = 0xFFFFFFFF
+
+DIRECTIONS = ["NORTH", "EAST", "SOUTH", "WEST"]
+VEHICLE_TYPES = list(VEHICLE_SPECS)
+SIGNAL_STATES = ["RED", "YELLOW", "GREEN"]
+
+
+def encode_state(snapshot):
+    """Packs an IntersectionSnapshot into ({vehicle id: record}, {direction index: record})."""
+    vehicles = {
+        v.id: VEHICLE.pack(v.id, VEHICLE_TYPES.index(v.type), DIRECTIONS.index(v.direction), lane_id,
+                           *v.color, v.x, v.y, v.speed)
+        for lanes in snapshot.vehicles.values()
+        for lane_id, lane in lanes.items()
+        for v in lane
+    }
+    signals = {
+        i: SIGNAL.pack(i, SIGNAL_STATES.index(s.state), s.vehicles_passed, s.vehicles_waiting)
+        for i, s in enumerate(snapshot.signals[d] for d in DIRECTIONS)
+    }
+    return vehicles, signals
+
+
+def encode_delta(frame, step, state, base_frame=NO_BASE, base_state=({}, {})):
+    """Returns the length-prefixed message taking a client from base_state to state."""
+    vehicles, signals = state
+    base_vehicles, base_signals = base_state
+    changed = [record for vid, record in vehicles.items() if base_vehicles.get(vid) != record]
+    removed = [REMOVED.pack(vid) for vid in base_vehicles if vid not in vehicles]
+    signal_records = [record for i, record in signals.items() if base_signals.get(i) != record]
+    body = b"".join([FRAME.pack(frame, base_frame, step, len(changed), len(removed), len(signal_records)),
+                     *changed, *removed, *signal_records])
+    return LENGTH.pack(len(body)) + body
+
+
+# --- StateServer Class ---
+class StateServer(threading.Thread):
+    """Observer that streams delta-encoded state to every connected client.
+
+    Listens on a Unix socket if `path` is given, otherwise on TCP host:port.
+    Use as an observer: main(..., observers=[server]).
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, path=None, stride=1, history=120):
+        super().__init__(name="state-server", daemon=True)
+        self.stride = stride
+        self.history = history  # Frames kept as possible delta bases
+        self.frames = OrderedDict()  # frame -> encoded state
+        self.frame = 0
+        self.step = 0
+        self.clients = {}  # StreamWriter -> asyncio.Event set when a new frame is ready
+        self.acked = {}  # StreamWriter -> last acknowledged frame (None: send full frames)
+        self.latest = None
+        self.pending = False
+        self.skipped = 0
+        self.loop = asyncio.new_event_loop()
+        if path is not None:
+            server = asyncio.start_unix_server(self.serve, path)
+        else:
+            server = asyncio.start_server(self.serve, host, port)
+        self.server = self.loop.run_until_complete(server)
+        self.start()
+
+    def __call__(self, intersection):
+        """Publishes the current state; never blocks the simulation.
+
+        Nothing is copied while no client is connected, or while the last
+        snapshot is still waiting for the server thread to encode it.
+        """
+        if intersection.step_count % self.stride or not self.clients or self.pending:
+            return
+        self.latest = intersection.snapshot()
+        self.pending = True
+        self.loop.call_soon_threadsafe(self.publish)
+
+    def run(self):
+        """Thread body: runs the event loop until close()."""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def publish(self):
+        """Encodes the latest snapshot as a new frame and wakes every client."""
+        self.pending = False
+        self.frame += 1
+        self.step = self.latest.step_count
+        self.frames[self.frame] = encode_state(self.latest)
+        while len(self.frames) > self.history:
+            self.frames.popitem(last=False)
+        for wake in self.clients.values():
+            wake.set()
+
+    async def serve(self, reader, writer):
+        """Per-client coroutine: sends the newest frame whenever the client has taken the last one.
+
+        Waiting for the socket to drain holds up only this client; frames
+        published in the meantime are folded into its next delta.
+        """
+        sock = writer.get_extra_info("socket")
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        wake = self.clients[writer] = asyncio.Event()
+        self.acked[writer] = None
+        acks = asyncio.ensure_future(self.read_acks(reader, writer, wake))
+        sent = self.frame
+        try:
+            while True:
+                await wake.wait()
+                wake.clear()
+                if acks.done():
+                    break
+                frame, acked = self.frame, self.acked[writer]
+                if acked in self.frames:
+                    writer.write(encode_delta(frame, self.step, self.frames[frame], acked, self.frames[acked]))
+                else:
+                    writer.write(encode_delta(frame, self.step, self.frames[frame]))
+                self.skipped += frame - sent - 1
+                sent = frame
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            acks.cancel()
+            del self.clients[writer], self.acked[writer]
+            writer.close()
+
+    async def read_acks(self, reader, writer, wake):
+        """Records the frames a client acknowledges until it disconnects."""
+        try:
+            while True:
+                frame, = ACK.unpack(await reader.readexactly(ACK.size))
+                if frame in self.frames:
+                    self.acked[writer] = frame
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            wake.set()  # Let serve() notice the disconnect
+
+    def close(self):
+        """Disconnects every client and stops the server thread."""
+        def shutdown():
+            self.server.close()
+            for writer in self.clients:
+                writer.close()
+            self.loop.stop()
+        self.loop.call_soon_threadsafe(shutdown)
+        self.join()
+
+
+# --- StateClient Class ---
+class StateClient:
+    """Blocking client that decodes the stream and acknowledges every frame.
+
+    Iterating yields (frame, step, vehicles, signals), where vehicles maps id
+    to (type, direction, lane, color, x, y, speed) and signals maps direction
+    to (state, vehicles_passed, vehicles_waiting).
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, path=None, history=120):
+        if path is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.sock.makefile("rb")
+        self.history = history
+        self.states = OrderedDict()  # frame -> (vehicles, signals) as applied here
+
+    def __iter__(self):
+        while True:
+            prefix = self.file.read(LENGTH.size)
+            if len(prefix) < LENGTH.size:
+                return
+            body = self.file.read(LENGTH.unpack(prefix)[0])
+            frame, step, vehicles, signals = self.apply(body)
+            self.sock.sendall(ACK.pack(frame))
+            yield frame, step, vehicles, signals
+
+    def apply(self, body):
+        """Applies one message to the state of its base frame and returns the new state."""
+        frame, base, step, changed, removed, signal_count = FRAME.unpack_from(body, 0)
+        base_vehicles, base_signals = self.states.get(base, ({}, {}))
+        vehicles, signals = dict(base_vehicles), dict(base_signals)
+
+        offset = FRAME.size
+        for vid, vtype, direction, lane, r, g, b, x, y, speed in \
+                VEHICLE.iter_unpack(body[offset:offset + changed * VEHICLE.size]):
+            vehicles[vid] = (VEHICLE_TYPES[vtype], DIRECTIONS[direction], lane, (r, g, b), x, y, speed)
+        offset += changed * VEHICLE.size
+        for vid, in REMOVED.iter_unpack(body[offset:offset + removed * REMOVED.size]):
+            del vehicles[vid]
+        offset += removed * REMOVED.size
+        for direction, state, passed, waiting in SIGNAL.iter_unpack(body[offset:offset + signal_count * SIGNAL.size]):
+            signals[DIRECTIONS[direction]] = (SIGNAL_STATES[state], passed, waiting)
+
+        self.states[frame] = (vehicles, signals)
+        while len(self.states) > self.history:
+            self.states.popitem(last=False)
+        return frame, step, vehicles, signals
+
+    def close(self):
+        """Closes the connection."""
+        self.file.close()
+        self.sock.close()
+
+
+if __name__ == "__main__":
+    from traffic_visualiser import main  # Only here, so clients can import StateClient without pygame
+
+    parser = argparse.ArgumentParser(description="Run the simulation and stream its state to local clients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--stride", type=int, default=1, help="stream every Nth physics step")
+    parser.add_argument("--threaded", action="store_true", help="step the simulation on its own thread")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = StateServer(args.host, args.port, args.unix, args.stride)
+    try:
+        main(intersection=Intersection(seed=args.seed), observers=[server], threaded=args.threaded)
+    finally:
+        server.close()
+    print(f"Streamed {server.frame} frames ({server.skipped} skipped for slow clients)")
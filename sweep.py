@@ -0,0 +1,144 @@
+"""Parameter sweep runner for signal timing experiments.
+
+Runs many headless simulations in a ProcessPoolExecutor, one per combination
+of green duration, yellow duration, spawn rate and vehicle mix, repeated for
+a number of seeds. Every run builds its own Intersection with its own
+random.Random, so parameters never leak between runs that share a worker.
+
+Example:
+    python sweep.py --green 10 15 20 30 --yellow 3 4 --spawn-rate 0.5 1.0 \\
+        --runs 8 --seconds 3600 --csv results.csv
+"""
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import checkpoint
+from traffic_sim import Intersection, VEHICLE_TYPE_WEIGHTS, run_headless
+
+
+def parse_weights(text):
+    """Parses a vehicle mix such as "AUTO=30,CAR=35,BIKE=25" into a weights dict."""
+    weights = {}
+    for item in text.split(","):
+        vtype, _, weight = item.partition("=")
+        vtype = vtype.strip().upper()
+        if vtype not in VEHICLE_TYPE_WEIGHTS:
+            raise argparse.ArgumentTypeError(f"unknown vehicle type: {vtype}")
+        weights[vtype] = float(weight)
+    return weights
+
+
+def format_weights(weights):
+    """Formats a weights dict back into the "TYPE=weight,..." form."""
+    return ",".join(f"{vtype}={weight:g}" for vtype, weight in weights.items())
+
+
+def run_one(job):
+    """Runs a single headless simulation (executed in a worker process)."""
+    if job["checkpoint"]:
+        intersection = checkpoint.fork(
+            job["checkpoint"], seed=job["seed"], green_duration=job["green"], yellow_duration=job["yellow"],
+            spawn_rate=job["spawn_rate"], type_weights=job["weights"]
+        )
+    else:
+        intersection = Intersection(
+            green_duration=job["green"], yellow_duration=job["yellow"], spawn_rate=job["spawn_rate"],
+            type_weights=job["weights"], seed=job["seed"]
+        )
+    stats = run_headless(job["seconds"], intersection)
+    return {
+        **job,
+        "throughput": stats["total_passed"] * 3600 / job["seconds"],  # Vehicles per hour
+        "mean_queue": stats["mean_queue"],
+        "max_wait": stats["max_wait"]
+    }
+
+
+def build_jobs(greens, yellows, spawn_rates, mixes, runs, seconds, base_seed=0, checkpoint_path=None):
+    """Returns one job per parameter combination and seed.
+
+    The same seeds are reused for every combination, so differences between
+    combinations are not masked by different random traffic. With a
+    checkpoint, every run starts from its saved (warmed-up) state.
+    """
+    return [
+        {"green": green, "yellow": yellow, "spawn_rate": rate, "weights": weights,
+         "seed": base_seed + run, "seconds": seconds, "checkpoint": checkpoint_path}
+        for green, yellow, rate, weights in itertools.product(greens, yellows, spawn_rates, mixes)
+        for run in range(runs)
+    ]
+
+
+def aggregate(results):
+    """Groups runs by parameters and returns one row per combination.
+
+    Throughput and mean queue are averaged over seeds; max wait is the worst
+    case over seeds.
+    """
+    groups = {}
+    for result in results:
+        key = (result["green"], result["yellow"], result["spawn_rate"], format_weights(result["weights"]))
+        groups.setdefault(key, []).append(result)
+
+    table = []
+    for (green, yellow, rate, weights), runs in groups.items():
+        table.append({
+            "green": green, "yellow": yellow, "spawn_rate": rate, "weights": weights, "runs": len(runs),
+            "throughput": sum(r["throughput"] for r in runs) / len(runs),
+            "mean_queue": sum(r["mean_queue"] for r in runs) / len(runs),
+            "max_wait": max(r["max_wait"] for r in runs)
+        })
+    return table
+
+
+def sweep(jobs, workers=None):
+    """Runs all jobs on a process pool and returns the aggregated table."""
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run_one, jobs, chunksize=chunksize))
+    return aggregate(results)
+
+
+def print_table(table, out=sys.stdout):
+    """Prints the aggregated table as aligned columns."""
+    header = f"{'green':>6} {'yellow':>6} {'rate':>6} {'runs':>4} {'veh/h':>8} {'queue':>7} {'max wait':>9}  mix"
+    print(header, file=out)
+    for row in table:
+        print(f"{row['green']:>6g} {row['yellow']:>6g} {row['spawn_rate']:>6g} {row['runs']:>4} "
+              f"{row['throughput']:>8.1f} {row['mean_queue']:>7.2f} {row['max_wait']:>8.1f}s  {row['weights']}",
+              file=out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Signal timing parameter sweep")
+    parser.add_argument("--green", type=float, nargs="+", default=[15], help="green durations (s)")
+    parser.add_argument("--yellow", type=float, nargs="+", default=[3], help="yellow durations (s)")
+    parser.add_argument("--spawn-rate", type=float, nargs="+", default=[0.5], help="spawn rates (vehicles/s)")
+    parser.add_argument("--weights", type=parse_weights, nargs="+", default=[VEHICLE_TYPE_WEIGHTS],
+                        help='vehicle mixes, e.g. "AUTO=30,CAR=35,BIKE=25,BUS=5,TRUCK=3,AMBULANCE=2"')
+    parser.add_argument("--runs", type=int, default=4, help="seeds per combination")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--seconds", type=float, default=3600, help="simulated seconds per run")
+    parser.add_argument("--checkpoint", help="start every run from this checkpoint instead of an empty intersection")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--csv", help="also write the table to this CSV file")
+    args = parser.parse_args()
+
+    jobs = build_jobs(args.green, args.yellow, args.spawn_rate, args.weights, args.runs, args.seconds, args.seed,
+                      args.checkpoint)
+    start = time.perf_counter()
+    table = sweep(jobs, args.workers)
+    print(f"{len(jobs)} runs in {time.perf_counter() - start:.1f}s")
+    print_table(table)
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(table[0]))
+            writer.writeheader()
+            writer.writerows(table)
@@ -0,0 +1,919 @@
+"""Simulation core: lanes, vehicles, signals, spawning and the fixed-step clock.
+
+Nothing in this module imports pygame, so batch workers (sweeps, road
+networks, exporters) can import it cheaply. traffic_visualiser.py is the
+renderer and window layer on top of it.
+"""
+import heapq
+import queue
+import random
+import threading
+import time
+from collections import deque, namedtuple
+
+# --- Constants ---
+WIDTH, HEIGHT = 1400, 900
+CENTER_X, CENTER_Y = WIDTH // 2, HEIGHT // 2
+
+# Road and Lane Dimensions
+ROAD_WIDTH = 180
+HALF_ROAD_WIDTH = ROAD_WIDTH // 2  # 90
+LANE_COUNT_PER_HALF = 2
+LANE_WIDTH = HALF_ROAD_WIDTH // LANE_COUNT_PER_HALF  # 90 // 2 = 45
+# Offset from road center (e.g. CENTER_X) to center of each lane
+LANE_OFFSET_1 = LANE_WIDTH // 2  # 45 // 2 = 22
+LANE_OFFSET_2 = LANE_WIDTH + LANE_OFFSET_1 # 45 + 22 = 67
+STOP_LINE_OFFSET = 110  # How far from center cars should stop
+
+JUNCTION_MARGIN = 100  # Distance around the junction box watched for conflicts
+
+# Vehicle Specifications (Size, Speeds, Colors)
+# Speeds are now [max_speed, acceleration, deceleration]
+CAR_COLORS = [(200, 0, 0), (0, 100, 200), (100, 100, 100)]
+VEHICLE_SPECS = {
+    "AUTO": {
+        "size": (25, 40), "color": (255, 200, 0),
+        "speed": [2.5, 0.08, 0.25]
+    },
+    "CAR": {
+        "size": (30, 50), "color": random.choice(CAR_COLORS),
+        "speed": [3.0, 0.1, 0.3]
+    },
+    "BIKE": {
+        "size": (20, 35), "color": (50, 50, 50),
+        "speed": [3.5, 0.12, 0.35]
+    },
+    "BUS": {
+        "size": (35, 70), "color": (200, 50, 50),
+        "speed": [2.8, 0.05, 0.2]
+    },
+    "TRUCK": {
+        "size": (35, 65), "color": (80, 60, 40),
+        "speed": [2.0, 0.04, 0.15]
+    },
+    "AMBULANCE": {
+        "size": (30, 50), "color": (255, 255, 255),
+        "speed": [4.5, 0.15, 0.4]
+    }
+}
+
+# Simulation Settings
+PHYSICS_HZ = 60  # Fixed simulation steps per simulated second (vehicle speeds are px per step)
+SIM_DT = 1.0 / PHYSICS_HZ  # Simulated seconds per physics step
+GREEN_LIGHT_DURATION = 15  # seconds
+YELLOW_LIGHT_DURATION = 3   # seconds
+SPAWN_RATE_PER_SECOND = 0.5 # Avg vehicles per second
+VEHICLE_TYPE_WEIGHTS = {"AUTO": 30, "CAR": 35, "BIKE": 25, "BUS": 5, "TRUCK": 3, "AMBULANCE": 2}
+
+# Demand over the simulated day for SpawnSchedule: (start hour, multiplier of the spawn rate)
+DEMAND_PROFILES = {
+    "flat": [(0, 1.0)],
+    "commute": [(0, 0.2), (6, 0.7), (7, 1.8), (10, 0.9), (16, 1.2), (17, 1.8), (19, 0.8), (22, 0.4)]
+}
+
+
+# --- LaneGeometry Class ---
+class LaneGeometry:
+    """Precomputed thresholds and screen transform for one [direction][lane] approach.
+
+    Vehicles store a single coordinate "pos" along their lane that grows in
+    the direction of travel: pos = sign * y for NORTH/SOUTH and pos = sign * x
+    for EAST/WEST. All per-lane checks become plain comparisons on pos.
+    """
+
+    __slots__ = ("direction", "lane", "vertical", "sign", "cross", "stop_zone", "pass_pos",
+                 "remove_pos", "spawn_pos", "spawn_clear_pos", "area_start")
+
+    def __init__(self, direction, lane, cross, world_size=(WIDTH, HEIGHT)):
+        self.direction = direction
+        self.lane = lane
+        self.vertical = direction in ["NORTH", "SOUTH"]
+        self.sign = -1 if direction in ["NORTH", "WEST"] else 1
+        self.cross = cross  # Fixed world coordinate across the lane
+        
+        extent = world_size[1] if self.vertical else world_size[0]
+        center = extent // 2
+        origin = self.sign * center
+        self.stop_zone = (origin - STOP_LINE_OFFSET - 80, origin - STOP_LINE_OFFSET - 20)
+        self.pass_pos = origin + ROAD_WIDTH
+        self.remove_pos = extent + 200 if self.sign > 0 else 200
+        self.spawn_pos = -100 if self.sign > 0 else -(extent + 100)
+        # Spawning is blocked while the last vehicle is behind this position
+        self.spawn_clear_pos = {"NORTH": -(extent - 50), "SOUTH": -50,
+                                "EAST": -50, "WEST": -(extent + 50)}[direction]
+        self.area_start = origin - ROAD_WIDTH / 2 - JUNCTION_MARGIN  # Start of the junction area
+
+    def to_screen(self, pos):
+        """Returns the (x, y) world coordinates of a lane position."""
+        if self.vertical:
+            return self.cross, self.sign * pos
+        return self.sign * pos, self.cross
+
+
+# --- Vehicle Class ---
+class Vehicle:
+    """Represents a single vehicle in the simulation."""
+
+    __slots__ = ("id", "direction", "type", "lane", "geometry", "pos", "passed", "wait_steps",
+                 "vehicle_width", "length", "color", "max_speed", "accel", "decel", "speed",
+                 "width", "height")
+
+    def __init__(self, vid, geometry, vtype, rng=random, color=None):
+        self.id = vid
+        self.geometry = geometry  # LaneGeometry of the approach lane
+        self.pos = geometry.spawn_pos  # Distance along the lane
+        self.direction = geometry.direction
+        self.type = vtype
+        self.lane = geometry.lane  # 0 or 1
+        self.passed = False
+        self.wait_steps = 0  # Physics steps spent stopped before passing
+
+        # Get specs from constant
+        specs = VEHICLE_SPECS[vtype]
+        
+        size = specs["size"] # (width across lane, length along lane)
+        self.vehicle_width = size[0] # The vehicle's physical width
+        self.length = size[1] # The vehicle's physical length
+        self.color = color or (specs["color"] if vtype != "CAR" else rng.choice(CAR_COLORS))
+        
+        self.max_speed, self.accel, self.decel = specs["speed"]
+        self.speed = 0  # Start from stationary
+        
+        # Adjust dimensions for drawing based on direction
+        if self.direction in ["NORTH", "SOUTH"]:
+            self.width, self.height = self.vehicle_width, self.length
+        else: # EAST, WEST
+            self.width, self.height = self.length, self.vehicle_width
+
+    @property
+    def x(self):
+        """Screen x coordinate of the vehicle's center."""
+        return self.geometry.to_screen(self.pos)[0]
+
+    @property
+    def y(self):
+        """Screen y coordinate of the vehicle's center."""
+        return self.geometry.to_screen(self.pos)[1]
+
+    def control_speed(self, signal_state, vehicle_ahead, must_yield=False):
+        """Calculates and applies acceleration or deceleration.
+
+        must_yield is set when crossing traffic in the junction has priority.
+        """
+        
+        # Check 1: Is there a vehicle ahead and are we too close?
+        stop_for_vehicle = False
+        if vehicle_ahead:
+            # Calculate distance to vehicle in front
+            dist = vehicle_ahead.pos - self.pos - (self.length / 2) - (vehicle_ahead.length / 2)
+            
+            # Safe stopping distance is dynamic based on speed
+            safe_dist = max(10, self.speed * 10) # Simple formula: 10px + buffer for speed
+            if dist < safe_dist:
+                stop_for_vehicle = True
+
+        # Check 2: Should we stop for the traffic signal?
+        stop_for_signal = False
+        if self.type != "AMBULANCE" and signal_state in ["RED", "YELLOW"]:
+            stop_zone_start, stop_zone_end = self.geometry.stop_zone
+            stop_for_signal = stop_zone_start < self.pos < stop_zone_end
+
+        # --- Final Speed Adjustment ---
+        if stop_for_vehicle or stop_for_signal or must_yield:
+            # Need to stop, apply deceleration
+            self.speed = max(0, self.speed - self.decel)
+        else:
+            # Clear to go, apply acceleration
+            self.speed = min(self.max_speed, self.speed + self.accel)
+
+    def move(self):
+        """Moves the vehicle along its lane based on its current speed."""
+        self.pos += self.speed
+
+    def rect(self):
+        """Returns the (left, top, right, bottom) screen bounds of the vehicle."""
+        x, y = self.geometry.to_screen(self.pos)
+        return (x - self.width / 2, y - self.height / 2, x + self.width / 2, y + self.height / 2)
+
+    def swept_rect(self, rect):
+        """Returns rect extended forward by the vehicle's safe stopping distance."""
+        left, top, right, bottom = rect
+        reach = max(10, self.speed * 10)
+        if self.geometry.vertical:
+            return (left, top - reach, right, bottom) if self.geometry.sign < 0 else (left, top, right, bottom + reach)
+        return (left - reach, top, right, bottom) if self.geometry.sign < 0 else (left, top, right + reach, bottom)
+
+    def update(self, signal_state, vehicle_ahead, must_yield=False):
+        """Main update call for the vehicle."""
+        self.control_speed(signal_state, vehicle_ahead, must_yield)
+        self.move()
+
+
+# --- TrafficSignal Class ---
+class TrafficSignal:
+    """Controls a single traffic light."""
+
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+        self.state = "RED"
+        self.vehicles_passed = 0
+        self.vehicles_waiting = 0
+
+
+# --- SignalController Class ---
+class SignalHead:
+    """One signal head: a repeating list of (state, duration) phases."""
+
+    def __init__(self, phases, index, start):
+        self.phases = phases
+        self.index = index
+        self.start = start  # When the current phase began
+        self.deadline = None  # When it ends; None while held by an override
+
+    @property
+    def state(self):
+        return self.phases[self.index][0]
+
+    @property
+    def duration(self):
+        return self.phases[self.index][1]
+
+
+class SignalController:
+    """Advances any number of signal heads from a priority queue of phase deadlines.
+
+    Only heads whose deadline has passed are touched by advance(), and
+    next_deadline() tells a display loop how long it can sleep. Time is in
+    whatever unit the caller uses (milliseconds, physics steps), as long as
+    the phase durations use the same one.
+    """
+
+    def __init__(self):
+        self.heads = {}
+        self.deadlines = []  # Heap of (deadline, sequence, key); stale entries are skipped
+        self.sequence = 0
+
+    def add(self, key, phases, now=0, index=0):
+        """Adds a head that starts phase `index` at time `now`."""
+        self.check_phases(phases)
+        self.heads[key] = SignalHead(phases, index, now)
+        self.schedule(key)
+        return self.heads[key]
+
+    @staticmethod
+    def check_phases(phases):
+        """Rejects a phase list whose cycle takes no time, which advance() could never get past."""
+        if sum(duration for _, duration in phases) <= 0:
+            raise ValueError("signal phases must have a positive total duration")
+
+    def schedule(self, key):
+        """Queues the end of a head's current phase."""
+        head = self.heads[key]
+        head.deadline = head.start + head.duration
+        self.sequence += 1
+        heapq.heappush(self.deadlines, (head.deadline, self.sequence, key))
+
+    def next_deadline(self):
+        """Returns the earliest pending phase deadline, or None if every head is held."""
+        deadlines = self.deadlines
+        while deadlines and deadlines[0][0] != self.heads[deadlines[0][2]].deadline:
+            heapq.heappop(deadlines)
+        return deadlines[0][0] if deadlines else None
+
+    def advance(self, now):
+        """Moves every head whose deadline has passed on to its next phase.
+
+        Phases start exactly at the previous deadline, not at `now`, so a late
+        call does not make the cycle drift. Returns the keys of the heads that
+        changed, in deadline order.
+        """
+        changed = []
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > now:
+                return changed
+            _, _, key = heapq.heappop(self.deadlines)
+            head = self.heads[key]
+            head.index = (head.index + 1) % len(head.phases)
+            head.start = deadline
+            self.schedule(key)
+            if key not in changed:
+                changed.append(key)
+
+    def override(self, key, index, now):
+        """Forces a head into phase `index` and holds it there until release()."""
+        head = self.heads[key]
+        head.index, head.start, head.deadline = index, now, None
+
+    def set_phases(self, key, phases):
+        """Replaces a head's phase list, keeping its current phase index and start time."""
+        self.check_phases(phases)
+        head = self.heads[key]
+        head.phases = phases
+        if head.deadline is not None:
+            self.schedule(key)
+
+    def release(self, key, now):
+        """Restarts a held head's current phase at `now` and resumes its cycle."""
+        self.heads[key].start = now
+        self.schedule(key)
+
+    def remaining(self, key, now):
+        """Returns the time left in a head's current phase (negative once a held phase overruns)."""
+        head = self.heads[key]
+        return head.start + head.duration - now
+
+
+# --- SpatialHash Class ---
+def rects_overlap(a, b):
+    """Returns True if two (left, top, right, bottom) rects overlap."""
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class SpatialHash:
+    """Uniform grid mapping cells to the vehicles whose rects touch them.
+
+    update() only re-files a vehicle when the set of cells it covers changes,
+    which at a few pixels per step is rare, so keeping the grid current costs
+    O(moved vehicles) and a query only looks at the vehicles in nearby cells.
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> {id: vehicle}
+        self.entries = {}  # id -> (cells, rect, vehicle)
+
+    def cells_of(self, rect):
+        """Returns the grid cells covered by a rect."""
+        size = self.cell_size
+        left, top, right, bottom = rect
+        return tuple((cx, cy) for cx in range(int(left // size), int(right // size) + 1)
+                     for cy in range(int(top // size), int(bottom // size) + 1))
+
+    def update(self, v, rect):
+        """Inserts a vehicle or moves it to its new rect."""
+        cells = self.cells_of(rect)
+        old = self.entries.get(v.id)
+        if old is None or old[0] != cells:
+            if old is not None:
+                self.remove(v.id)
+            for cell in cells:
+                self.cells.setdefault(cell, {})[v.id] = v
+        self.entries[v.id] = (cells, rect, v)
+
+    def remove(self, vid):
+        """Drops a vehicle from the grid."""
+        cells = self.entries.pop(vid)[0]
+        for cell in cells:
+            bucket = self.cells[cell]
+            del bucket[vid]
+            if not bucket:
+                del self.cells[cell]
+
+    def query(self, rect):
+        """Returns the (vehicle, rect) pairs whose rects overlap rect."""
+        seen = set()
+        found = []
+        for cell in self.cells_of(rect):
+            for vid in self.cells.get(cell, ()):
+                if vid not in seen:
+                    seen.add(vid)
+                    other_rect, other = self.entries[vid][1:]
+                    if rects_overlap(rect, other_rect):
+                        found.append((other, other_rect))
+        return found
+
+
+# --- SpawnSchedule Class ---
+class SpawnSchedule:
+    """Pre-drawn arrival times and attributes for the vehicles to spawn.
+
+    Each approach receives a Poisson stream of arrivals whose rate is `rate`
+    (vehicles per simulated second over all approaches) split evenly across
+    the approaches and scaled by the demand profile for the time of day.
+    Arrivals are generated `batch_seconds` of simulated time at a time from
+    the schedule's own random.Random, so a seed fixes the whole run.
+    """
+
+    def __init__(self, rate, directions, type_weights, profile=None, seed=None, batch_seconds=600):
+        self.rate = rate
+        self.directions = list(directions)
+        self.types, self.weights = list(type_weights), list(type_weights.values())
+        self.profile = sorted(profile or DEMAND_PROFILES["flat"])
+        self.rng = random.Random(seed)
+        self.batch_seconds = batch_seconds
+        self.generated_until = 0.0  # Simulated seconds covered by the generated batches
+        self.arrivals = deque()  # (step, direction, vtype, lane_id, color) in arrival order
+
+    def segment(self, t):
+        """Returns (multiplier, end time) of the profile segment containing simulated time t."""
+        day, seconds = divmod(t, 86400)
+        multiplier, end = self.profile[-1][1], 86400  # Before the first start hour, last segment applies
+        for hour, m in self.profile:
+            if hour * 3600 > seconds:
+                end = hour * 3600
+                break
+            multiplier = m
+        return multiplier, day * 86400 + end
+
+    def extend(self):
+        """Generates the next batch of arrivals."""
+        start = self.generated_until
+        end = start + self.batch_seconds
+        
+        # Arrival times per approach and profile segment. Inter-arrival times
+        # are memoryless, so each segment can start afresh at its boundary.
+        times = []
+        t = start
+        while t < end:
+            multiplier, boundary = self.segment(t)
+            boundary = min(boundary, end)
+            rate = self.rate * multiplier / len(self.directions)
+            if rate > 0:
+                for direction in self.directions:
+                    arrival = t + self.rng.expovariate(rate)
+                    while arrival < boundary:
+                        times.append((arrival, direction))
+                        arrival += self.rng.expovariate(rate)
+            t = boundary
+        times.sort()
+        
+        # Attributes for the whole batch at once
+        count = len(times)
+        types = self.rng.choices(self.types, self.weights, k=count)
+        lanes = self.rng.choices([0, 1], k=count)
+        colors = self.rng.choices(CAR_COLORS, k=count)
+        for (arrival, direction), vtype, lane_id, color in zip(times, types, lanes, colors):
+            self.arrivals.append((int(arrival * PHYSICS_HZ), direction, vtype, lane_id,
+                                  color if vtype == "CAR" else None))
+        self.generated_until = end
+
+    def due(self, step):
+        """Removes and returns the arrivals scheduled up to and including a physics step."""
+        while self.generated_until * PHYSICS_HZ <= step:
+            self.extend()
+        due = []
+        while self.arrivals and self.arrivals[0][0] <= step:
+            due.append(self.arrivals.popleft())
+        return due
+
+
+# --- Intersection Class ---
+class Intersection:
+    """Manages the entire simulation, including signals, vehicles, and drawing.
+
+    Timing, demand and vehicle mix default to the module-level settings and
+    can be overridden per instance. Passing a seed gives the instance its own
+    random.Random so that runs are reproducible and independent of each other.
+    A SpawnSchedule, if given, replaces the per-tick random spawning. With
+    junction_conflicts, vehicles in and around the junction box yield to
+    crossing traffic that has priority (vehicles already in the box first,
+    then ambulances, then the older vehicle).
+
+    world_size defaults to the window size; a larger world gives longer
+    approaches, with spawning and removal at the edges of the world.
+    """
+
+    def __init__(self, green_duration=None, yellow_duration=None, spawn_rate=None,
+                 type_weights=None, seed=None, schedule=None, junction_conflicts=False, world_size=None):
+        self.green_duration = GREEN_LIGHT_DURATION if green_duration is None else green_duration
+        self.yellow_duration = YELLOW_LIGHT_DURATION if yellow_duration is None else yellow_duration
+        self.spawn_rate = SPAWN_RATE_PER_SECOND if spawn_rate is None else spawn_rate
+        self.type_weights = dict(type_weights or VEHICLE_TYPE_WEIGHTS)
+        self.rng = random if seed is None else random.Random(seed)
+        self.schedule = schedule
+        self.junction_grid = SpatialHash() if junction_conflicts else None
+        
+        # World dimensions, with the junction at the center
+        self.world_size = tuple(world_size or (WIDTH, HEIGHT))
+        self.center = center_x, center_y = self.world_size[0] // 2, self.world_size[1] // 2
+        half = ROAD_WIDTH / 2
+        self.junction_box = (center_x - half, center_y - half, center_x + half, center_y + half)
+        self.junction_area = (center_x - half - JUNCTION_MARGIN, center_y - half - JUNCTION_MARGIN,
+                              center_x + half + JUNCTION_MARGIN, center_y + half + JUNCTION_MARGIN)
+        
+        # Lane positions [Lane 0, Lane 1]
+        # (Assuming Right-Hand Traffic)
+        self.lane_positions = {
+            "NORTH": [center_x + LANE_OFFSET_1, center_x + LANE_OFFSET_2], # Right side
+            "SOUTH": [center_x - LANE_OFFSET_1, center_x - LANE_OFFSET_2], # Left side
+            "EAST": [center_y + LANE_OFFSET_1, center_y + LANE_OFFSET_2],  # Bottom side
+            "WEST": [center_y - LANE_OFFSET_1, center_y - LANE_OFFSET_2]   # Top side
+        }
+        
+        # Signal positions
+        self.signals = {d: TrafficSignal(x, y) for d, (x, y) in {
+            "NORTH": (center_x - half - 20, center_y - half),
+            "SOUTH": (center_x + half + 20, center_y + half),
+            "EAST": (center_x + half, center_y - half - 20),
+            "WEST": (center_x - half, center_y + half + 20)
+        }.items()}
+        
+        self.signal_cycle = ["NORTH", "EAST", "SOUTH", "WEST"]
+        self.lane_geometry = {
+            d: [LaneGeometry(d, lane_id, self.lane_positions[d][lane_id], self.world_size) for lane_id in [0, 1]]
+            for d in self.signal_cycle
+        }
+        self.step_count = 0  # Physics steps since the simulation started
+        
+        # The four-approach cycle is one controller head timed in physics steps
+        self.signal_controller = SignalController()
+        self.signal_controller.add("cycle", self.signal_phases())
+        self.apply_signal_phase()
+        self.signal_timer = 0  # Whole seconds into the current phase
+        
+        # Vehicles stored by [direction][lane_id], front of the queue first
+        self.vehicles = {d: {0: deque(), 1: deque()} for d in self.signal_cycle}
+        self.vehicle_id_counter = 0
+        
+        # Approaches that spawn random traffic, and where vehicles leaving the
+        # screen are collected (None discards them) when part of a RoadNetwork
+        self.spawn_directions = list(self.signal_cycle)
+        self.departures = None
+        
+        # Statistics
+        self.total_spawned = 0
+        self.total_passed = 0
+        self.total_received = 0
+        self.spawn_timer = 0
+        self.waiting_step_sum = 0  # Waiting vehicles summed over all steps (for the mean queue)
+        self.max_wait_steps = 0  # Longest stop of any vehicle that has passed
+        self.stats_start_step = 0  # Step at which the statistics were last reset
+
+    def spawn_vehicle(self, direction=None, vtype=None, lane_id=None, color=None):
+        """Spawns a new vehicle; direction, type and lane not given are drawn at random."""
+        direction = direction or self.rng.choice(self.spawn_directions)
+        vtype = vtype or self.rng.choices(list(self.type_weights), weights=list(self.type_weights.values()))[0]
+        lane_id = self.rng.choice([0, 1]) if lane_id is None else lane_id
+        
+        new_vehicle = Vehicle(self.vehicle_id_counter, self.lane_geometry[direction][lane_id], vtype,
+                              self.rng, color)
+        
+        # Check if spawn point is clear (prevent overlapping spawns)
+        if not self.spawn_point_clear(direction, lane_id):
+            return
+
+        self.add_vehicle(new_vehicle)
+
+    def receive_vehicle(self, vehicle):
+        """Takes over a vehicle handed off by a neighbouring intersection.
+
+        The vehicle keeps its identity and speed and is placed at this
+        intersection's entry point for its lane. Returns False (and leaves
+        the vehicle untouched) if the entry point is still occupied.
+        """
+        if not self.spawn_point_clear(vehicle.direction, vehicle.lane):
+            return False
+        vehicle.geometry = self.lane_geometry[vehicle.direction][vehicle.lane]
+        vehicle.pos = vehicle.geometry.spawn_pos
+        vehicle.passed = False
+        self.vehicles[vehicle.direction][vehicle.lane].append(vehicle)
+        self.total_received += 1
+        return True
+
+    def spawn_point_clear(self, direction, lane_id):
+        """Returns False while the last vehicle in the lane is still near the spawn point."""
+        lane = self.vehicles[direction][lane_id]
+        return not lane or lane[-1].pos >= self.lane_geometry[direction][lane_id].spawn_clear_pos
+
+    def add_vehicle(self, vehicle):
+        """Appends a new vehicle to the back of its lane queue."""
+        self.vehicles[vehicle.direction][vehicle.lane].append(vehicle)
+        self.vehicle_id_counter += 1
+        self.total_spawned += 1
+
+    def signal_phases(self):
+        """Returns the controller phases ((index, state), steps) of the four-approach cycle."""
+        green_steps = round(self.green_duration * PHYSICS_HZ)
+        yellow_steps = round(self.yellow_duration * PHYSICS_HZ)
+        return [
+            ((index, state), steps)
+            for index in range(len(self.signal_cycle))
+            for state, steps in [("GREEN", green_steps), ("YELLOW", yellow_steps)]
+        ]
+
+    def retime_signals(self, green_duration=None, yellow_duration=None):
+        """Changes the signal timing; the current phase keeps its start and ends at its new length."""
+        if green_duration is not None:
+            self.green_duration = green_duration
+        if yellow_duration is not None:
+            self.yellow_duration = yellow_duration
+        self.signal_controller.set_phases("cycle", self.signal_phases())
+
+    def apply_signal_phase(self):
+        """Copies the controller's current phase onto the signal objects."""
+        self.current_signal_index, self.signal_state = self.signal_controller.heads["cycle"].state
+        current_green_dir = self.signal_cycle[self.current_signal_index]
+        for d in self.signal_cycle:
+            self.signals[d].state = self.signal_state if d == current_green_dir else "RED"
+
+    def update_signals(self):
+        """Advances the signal cycle; the signal objects are only touched when a phase ends."""
+        if self.signal_controller.advance(self.step_count):
+            self.apply_signal_phase()
+        # Whole seconds into the current phase, for the countdown display
+        self.signal_timer = (self.step_count - self.signal_controller.heads["cycle"].start) // PHYSICS_HZ
+
+    def resolve_conflicts(self):
+        """Returns the ids of vehicles that must hold back for crossing traffic.
+
+        The spatial hash holds the swept path (the rect extended forward by
+        the safe stopping distance) of every vehicle around the junction box.
+        A vehicle yields when a crossing vehicle stands in its path, or when
+        their paths cross and the other vehicle has priority.
+        """
+        grid = self.junction_grid
+        current = {}
+        for lanes in self.vehicles.values():
+            for lane in lanes.values():
+                for v in lane:
+                    if v.pos + v.length / 2 <= v.geometry.area_start:
+                        break  # This and all following vehicles are still upstream of the area
+                    rect = v.rect()
+                    if rects_overlap(rect, self.junction_area):
+                        grid.update(v, v.swept_rect(rect))
+                        current[v.id] = rect
+        for vid in grid.entries.keys() - current.keys():
+            grid.remove(vid)
+        
+        def priority(v):
+            return rects_overlap(current[v.id], self.junction_box), v.type == "AMBULANCE", -v.id
+        
+        yielding = set()
+        for _, swept, v in grid.entries.values():
+            if v.passed:
+                continue
+            rect = current[v.id]
+            for other, other_swept in grid.query(swept):
+                if other.geometry.vertical == v.geometry.vertical:
+                    continue
+                blocked = rects_overlap(swept, current[other.id])  # Other stands in our path
+                blocking = rects_overlap(other_swept, rect)  # We stand in its path
+                if (blocked and not blocking) or (blocked == blocking and priority(other) > priority(v)):
+                    yielding.add(v.id)
+                    break
+        return yielding
+
+    def update_vehicles(self):
+        """Updates all vehicles on the road."""
+        yielding = self.resolve_conflicts() if self.junction_grid is not None else ()
+        for direction in self.signal_cycle:
+            signal_state = self.signals[direction].state
+            waiting_count = 0
+            
+            for lane_id in [0, 1]:
+                lane = self.vehicles[direction][lane_id]
+                geometry = self.lane_geometry[direction][lane_id]
+                vehicle_ahead = None  # The vehicle directly in front
+                for v in lane:
+                    v.update(signal_state, vehicle_ahead, v.id in yielding)
+                    vehicle_ahead = v
+                    
+                    if v.speed < 0.1 and not v.passed:
+                        waiting_count += 1
+                        v.wait_steps += 1
+                    
+                    # Check if vehicle has passed the intersection
+                    if not v.passed and v.pos > geometry.pass_pos:
+                        v.passed = True
+                        self.total_passed += 1
+                        self.signals[direction].vehicles_passed += 1
+                        self.max_wait_steps = max(self.max_wait_steps, v.wait_steps)
+                
+                # Remove vehicles that are far off-screen. Vehicles never overtake
+                # within a lane, so they always leave from the head of the queue.
+                while lane and lane[0].pos > geometry.remove_pos:
+                    v = lane.popleft()
+                    if self.departures is not None:
+                        self.departures.append(v)
+                        
+            self.signals[direction].vehicles_waiting = waiting_count
+            self.waiting_step_sum += waiting_count
+
+    def update(self):
+        """Main simulation update step (advances the simulation by SIM_DT seconds)."""
+        self.step_count += 1
+        self.update_signals()
+        self.update_vehicles()
+        
+        if self.schedule is not None:
+            # Arrivals that find their spawn point occupied are dropped, as below
+            for _, direction, vtype, lane_id, color in self.schedule.due(self.step_count):
+                self.spawn_vehicle(direction, vtype, lane_id, color)
+            return
+        
+        # Randomly spawn vehicles
+        self.spawn_timer += 1
+        if self.spawn_rate > 0 and self.spawn_timer >= (PHYSICS_HZ / self.spawn_rate):
+            self.spawn_timer = 0
+            if self.spawn_directions and self.rng.random() < 0.75: # 75% chance to spawn
+                self.spawn_vehicle()
+
+    @property
+    def sim_time(self):
+        """Simulated seconds elapsed since the simulation started."""
+        return self.step_count * SIM_DT
+
+    def snapshot(self):
+        """Returns an immutable IntersectionSnapshot of the current state."""
+        return IntersectionSnapshot(self)
+
+    def __getstate__(self):
+        """Pickled state (see checkpoint.py).
+
+        An unseeded instance draws from the global random module, which
+        cannot be pickled; its current state is captured in a private
+        random.Random instead, so a restored copy continues the same
+        sequence without touching the global generator. Timed wrappers that
+        the profiler installs over methods are left out.
+        """
+        state = {k: v for k, v in self.__dict__.items() if not callable(getattr(type(self), k, None))}
+        if self.rng is random:
+            state["rng"] = random.Random()
+            state["rng"].setstate(random.getstate())
+        return state
+
+    def reset_stats(self):
+        """Zeroes the statistics (not the vehicles or signals), e.g. after a warm-up."""
+        self.total_spawned = self.total_passed = self.total_received = 0
+        self.waiting_step_sum = self.max_wait_steps = 0
+        self.stats_start_step = self.step_count
+        for signal in self.signals.values():
+            signal.vehicles_passed = 0
+
+    def get_stats(self):
+        """Returns a snapshot of the simulation counters.
+
+        mean_queue is the number of waiting vehicles averaged over all steps since the last reset;
+        max_wait is the longest time (in seconds) any vehicle has been stopped,
+        including vehicles that are still waiting.
+        """
+        still_waiting = [v.wait_steps for d in self.vehicles.values() for l in d.values() for v in l if not v.passed]
+        return {
+            "total_spawned": self.total_spawned,
+            "total_passed": self.total_passed,
+            "current": sum(len(l) for d in self.vehicles.values() for l in d.values()),
+            "mean_queue": self.waiting_step_sum / (self.step_count - self.stats_start_step)
+                          if self.step_count > self.stats_start_step else 0.0,
+            "max_wait": max([self.max_wait_steps] + still_waiting) * SIM_DT,
+            "signals": {
+                d: {
+                    "vehicles_passed": self.signals[d].vehicles_passed,
+                    "vehicles_waiting": self.signals[d].vehicles_waiting
+                } for d in self.signal_cycle
+            }
+        }
+
+
+# --- Snapshots ---
+VehicleSnapshot = namedtuple("VehicleSnapshot", "id type direction pos x y width height color speed")
+SignalSnapshot = namedtuple("SignalSnapshot", "x y state vehicles_passed vehicles_waiting")
+
+
+class IntersectionSnapshot:
+    """Frozen copy of the Intersection state that the renderer reads.
+
+    Attribute names match Intersection, so a renderer can draw either one.
+    Vehicles and signals are copied into namedtuples and lanes into tuples;
+    the snapshot is never modified once taken and can be read from any thread.
+    """
+
+    def __init__(self, intersection):
+        self.world_size = intersection.world_size
+        self.center = intersection.center
+        self.lane_geometry = intersection.lane_geometry  # Never modified after construction
+        self.step_count = intersection.step_count
+        self.sim_time = intersection.sim_time
+        self.signal_cycle = tuple(intersection.signal_cycle)
+        self.current_signal_index = intersection.current_signal_index
+        self.signal_state = intersection.signal_state
+        self.signal_timer = intersection.signal_timer
+        self.green_duration = intersection.green_duration
+        self.yellow_duration = intersection.yellow_duration
+        self.total_spawned = intersection.total_spawned
+        self.total_passed = intersection.total_passed
+        self.signals = {
+            d: SignalSnapshot(s.x, s.y, s.state, s.vehicles_passed, s.vehicles_waiting)
+            for d, s in intersection.signals.items()
+        }
+        self.vehicles = {
+            d: {
+                lane_id: tuple(
+                    VehicleSnapshot(v.id, v.type, v.direction, v.pos, *v.geometry.to_screen(v.pos),
+                                    v.width, v.height, v.color, v.speed)
+                    for v in lane
+                ) for lane_id, lane in lanes.items()
+            } for d, lanes in intersection.vehicles.items()
+        }
+
+
+# --- SimClock Class ---
+class SimClock:
+    """Fixed-timestep simulation clock with time scaling and frame skipping.
+
+    Wall-clock time, multiplied by time_scale, is collected in an accumulator
+    and paid out as whole physics steps of SIM_DT simulated seconds. When
+    rendering lags, several steps run before the next frame is drawn, so the
+    simulated world (and its statistics) keeps its pace.
+    """
+
+    TIME_SCALES = [1, 10, 100]
+
+    def __init__(self, time_scale=1, max_frame_time=0.25):
+        self.time_scale = time_scale
+        self.max_frame_time = max_frame_time  # Wall seconds credited per frame at most
+        self.accumulator = 0.0
+        self.dropped_time = 0.0  # Simulated seconds skipped because a frame took too long
+
+    def advance(self, real_seconds):
+        """Returns how many physics steps to run for real_seconds of wall time."""
+        if real_seconds > self.max_frame_time:
+            # Don't try to catch up after a long stall (window drag, breakpoint...)
+            self.dropped_time += (real_seconds - self.max_frame_time) * self.time_scale
+            real_seconds = self.max_frame_time
+        
+        self.accumulator += real_seconds * self.time_scale
+        steps = int(self.accumulator / SIM_DT + 1e-9)
+        self.accumulator = max(0.0, self.accumulator - steps * SIM_DT)
+        return steps
+
+
+# --- SimThread Class ---
+class SimThread(threading.Thread):
+    """Runs an Intersection on its own thread, paced by its own SimClock.
+
+    After each batch of steps the thread takes a snapshot into the back slot
+    of a double buffer and flips it to the front; readers only ever see
+    complete snapshots and never wait for a step to finish. Spawns and time
+    scale changes are sent through a command queue and applied between steps.
+    """
+
+    def __init__(self, intersection, observers=(), time_scale=1):
+        super().__init__(name="simulation", daemon=True)
+        self.intersection = intersection
+        self.observers = observers
+        self.clock = SimClock(time_scale)
+        self.commands = queue.Queue()
+        self.buffers = [intersection.snapshot(), None]
+        self.front = 0
+        self.running = True
+        self.start()
+
+    @property
+    def snapshot(self):
+        """The most recently published IntersectionSnapshot."""
+        return self.buffers[self.front]
+
+    def send(self, command, *args):
+        """Queues a command: ("spawn", direction) or ("time_scale", scale)."""
+        self.commands.put((command, args))
+
+    def run(self):
+        """Thread body: applies commands, steps the simulation and publishes snapshots."""
+        last = time.perf_counter()
+        while self.running:
+            changed = False
+            while not self.commands.empty():
+                command, args = self.commands.get_nowait()
+                if command == "spawn":
+                    self.intersection.spawn_vehicle(*args)
+                    changed = True
+                elif command == "time_scale":
+                    self.clock.time_scale = args[0]
+            
+            now = time.perf_counter()
+            steps = self.clock.advance(now - last)
+            last = now
+            for _ in range(steps):
+                self.intersection.update()
+                for observer in self.observers:
+                    observer(self.intersection)
+            
+            if steps or changed:
+                back = 1 - self.front
+                self.buffers[back] = self.intersection.snapshot()
+                self.front = back
+            
+            # Sleep until the next step is due
+            time.sleep(max(0.0, (SIM_DT - self.clock.accumulator) / self.clock.time_scale))
+
+    def stop(self):
+        """Stops the thread after its current batch of steps."""
+        self.running = False
+        self.join()
+
+
+# --- Headless Runner ---
+def run_headless(seconds, intersection=None, observers=()):
+    """Runs the simulation for a number of simulated seconds without a window.
+
+    No display, clock or drawing is involved, so the simulation advances as
+    fast as the CPU allows. Each observer is called with the intersection
+    after every step. Returns the final statistics from get_stats().
+    """
+    intersection = intersection or Intersection()
+    for _ in range(int(seconds * PHYSICS_HZ)):
+        intersection.update()
+        for observer in observers:
+            observer(intersection)
+    return intersection.get_stats()
@@ -1,22 +1,25 @@
+"""Pygame renderer and window for the traffic simulation.
+
+The simulation itself lives in traffic_sim.py and does not depend on pygame;
+this module draws it and runs the interactive main loop. pygame is only
+initialized once a window is opened (or a font is first needed offscreen).
+"""
+import argparse
+import json
 import pygame
-import random
+import time
+from collections import OrderedDict, deque
 from datetime import datetime
 
-pygame.init()
+import checkpoint
+from traffic_sim import (
+    WIDTH, HEIGHT, ROAD_WIDTH, STOP_LINE_OFFSET, SPAWN_RATE_PER_SECOND,
+    VEHICLE_TYPE_WEIGHTS, DEMAND_PROFILES, Intersection, SpawnSchedule, SimClock, SimThread, run_headless
+)
 
 # --- Constants ---
-WIDTH, HEIGHT = 1400, 900
-CENTER_X, CENTER_Y = WIDTH // 2, HEIGHT // 2
-
-# Road and Lane Dimensions
-ROAD_WIDTH = 180
-HALF_ROAD_WIDTH = ROAD_WIDTH // 2  # 90
-LANE_COUNT_PER_HALF = 2
-LANE_WIDTH = HALF_ROAD_WIDTH // LANE_COUNT_PER_HALF  # 90 // 2 = 45
-# Offset from road center (e.g. CENTER_X) to center of each lane
-LANE_OFFSET_1 = LANE_WIDTH // 2  # 45 // 2 = 22
-LANE_OFFSET_2 = LANE_WIDTH + LANE_OFFSET_1 # 45 + 22 = 67
-STOP_LINE_OFFSET = 110  # How far from center cars should stop
+FPS = 60  # Target render frame rate
+PAN_SPEED = 600  # Camera pan speed in screen pixels per second while an arrow key is held
 
 # Colors
 COLOR_GRASS = (34, 139, 34)
@@ -25,341 +28,317 @@ COLOR_LANE_LINE = (100, 100, 100)
 COLOR_DASHED_LINE = (255, 255, 255)
 COLOR_STOP_LINE = (255, 255, 255)
 
-# Vehicle Specifications (Size, Speeds, Colors)
-# Speeds are now [max_speed, acceleration, deceleration]
-VEHICLE_SPECS = {
-    "AUTO": {
-        "size": (25, 40), "color": (255, 200, 0),
-        "speed": [2.5, 0.08, 0.25]
-    },
-    "CAR": {
-        "size": (30, 50), "color": random.choice([(200, 0, 0), (0, 100, 200), (100, 100, 100)]),
-        "speed": [3.0, 0.1, 0.3]
-    },
-    "BIKE": {
-        "size": (20, 35), "color": (50, 50, 50),
-        "speed": [3.5, 0.12, 0.35]
-    },
-    "BUS": {
-        "size": (35, 70), "color": (200, 50, 50),
-        "speed": [2.8, 0.05, 0.2]
-    },
-    "TRUCK": {
-        "size": (35, 65), "color": (80, 60, 40),
-        "speed": [2.0, 0.04, 0.15]
-    },
-    "AMBULANCE": {
-        "size": (30, 50), "color": (255, 255, 255),
-        "speed": [4.5, 0.15, 0.4]
-    }
-}
-
-# Simulation Settings
-FPS = 60
-GREEN_LIGHT_DURATION = 15  # seconds
-YELLOW_LIGHT_DURATION = 3   # seconds
-SPAWN_RATE_PER_SECOND = 0.5 # Avg vehicles per second
-
-
-# --- Vehicle Class ---
-class Vehicle:
-    """Represents a single vehicle in the simulation."""
-
-    def __init__(self, vid, x, y, direction, vtype, lane):
-        self.id = vid
-        self.x = x
-        self.y = y
-        self.direction = direction
-        self.type = vtype
-        self.lane = lane  # 0 or 1
-        self.passed = False
-
-        # Get specs from constant
-        specs = VEHICLE_SPECS[vtype]
-        
-        size = specs["size"] # (width across lane, length along lane)
-        self.vehicle_width = size[0] # The vehicle's physical width
-        self.length = size[1] # The vehicle's physical length
-        self.color = specs["color"] if vtype != "CAR" else random.choice([(200, 0, 0), (0, 100, 200), (100, 100, 100)])
-        
-        self.max_speed, self.accel, self.decel = specs["speed"]
-        self.speed = 0  # Start from stationary
-        
-        # Adjust dimensions for drawing based on direction
-        if self.direction in ["NORTH", "SOUTH"]:
-            self.width, self.height = self.vehicle_width, self.length
-        else: # EAST, WEST
-            self.width, self.height = self.length, self.vehicle_width
-
-    def get_rect(self):
-        """Returns the pygame.Rect for this vehicle."""
-        return pygame.Rect(self.x - self.width / 2, self.y - self.height / 2, self.width, self.height)
-
-    def control_speed(self, signal_state, vehicle_ahead):
-        """Calculates and applies acceleration or deceleration."""
-        
-        # Check 1: Is there a vehicle ahead and are we too close?
-        stop_for_vehicle = False
-        if vehicle_ahead:
-            # Calculate distance to vehicle in front
-            if self.direction == "NORTH":
-                dist = self.y - vehicle_ahead.y - (self.height / 2) - (vehicle_ahead.height / 2)
-            elif self.direction == "SOUTH":
-                dist = vehicle_ahead.y - self.y - (self.height / 2) - (vehicle_ahead.height / 2)
-            elif self.direction == "EAST":
-                dist = vehicle_ahead.x - self.x - (self.width / 2) - (vehicle_ahead.width / 2)
-            else:  # WEST
-                dist = self.x - vehicle_ahead.x - (self.width / 2) - (vehicle_ahead.width / 2)
-            
-            # Safe stopping distance is dynamic based on speed
-            safe_dist = max(10, self.speed * 10) # Simple formula: 10px + buffer for speed
-            if dist < safe_dist:
-                stop_for_vehicle = True
-
-        # Check 2: Should we stop for the traffic signal?
-        stop_for_signal = False
-        if self.type != "AMBULANCE" and signal_state in ["RED", "YELLOW"]:
-            if self.direction == "NORTH" and STOP_LINE_OFFSET + 20 < self.y - CENTER_Y < STOP_LINE_OFFSET + 80:
-                stop_for_signal = True
-            elif self.direction == "SOUTH" and -STOP_LINE_OFFSET - 80 < self.y - CENTER_Y < -STOP_LINE_OFFSET - 20:
-                stop_for_signal = True
-            elif self.direction == "EAST" and -STOP_LINE_OFFSET - 80 < self.x - CENTER_X < -STOP_LINE_OFFSET - 20:
-                stop_for_signal = True
-            elif self.direction == "WEST" and STOP_LINE_OFFSET + 20 < self.x - CENTER_X < STOP_LINE_OFFSET + 80:
-                stop_for_signal = True
-
-        # --- Final Speed Adjustment ---
-        if stop_for_vehicle or stop_for_signal:
-            # Need to stop, apply deceleration
-            self.speed = max(0, self.speed - self.decel)
+
+VEHICLE_MARGIN = 40  # More than half the longest vehicle, for culling by center position
+
+
+# --- Camera Class ---
+class Camera:
+    """Viewport onto the world: the world point at the top-left of the screen and a zoom factor."""
+
+    ZOOM_LEVELS = [1 / 16, 1 / 8, 1 / 4, 1 / 2, 1, 2]
+
+    def __init__(self, size, center, zoom=1):
+        self.width, self.height = size
+        self.zoom = zoom
+        self.center_on(*center)
+
+    def center_on(self, x, y):
+        """Moves the camera so that world point (x, y) is in the middle of the screen."""
+        self.x = x - self.width / 2 / self.zoom
+        self.y = y - self.height / 2 / self.zoom
+
+    def pan(self, dx, dy):
+        """Moves the camera by (dx, dy) screen pixels."""
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+
+    def zoom_by(self, steps):
+        """Steps through ZOOM_LEVELS, keeping the middle of the screen in place."""
+        index = self.ZOOM_LEVELS.index(self.zoom) if self.zoom in self.ZOOM_LEVELS else 4
+        index = min(max(index + steps, 0), len(self.ZOOM_LEVELS) - 1)
+        left, top, right, bottom = self.viewport()
+        self.zoom = self.ZOOM_LEVELS[index]
+        self.center_on((left + right) / 2, (top + bottom) / 2)
+
+    def key(self):
+        """Hashable camera state, for caches of what was drawn through it."""
+        return self.x, self.y, self.zoom, self.width, self.height
+
+    def viewport(self):
+        """Returns the visible (left, top, right, bottom) area in world coordinates."""
+        return self.x, self.y, self.x + self.width / self.zoom, self.y + self.height / self.zoom
+
+    def point(self, x, y):
+        """Converts a world point to screen coordinates."""
+        return (x - self.x) * self.zoom, (y - self.y) * self.zoom
+
+    def rect(self, rect):
+        """Converts a world (x, y, w, h) rect to a screen pygame.Rect."""
+        x, y, w, h = rect
+        return pygame.Rect((x - self.x) * self.zoom, (y - self.y) * self.zoom, w * self.zoom, h * self.zoom)
+
+    def vehicle_rect(self, v):
+        """Returns the screen pygame.Rect of a vehicle."""
+        return self.rect((v.x - v.width / 2, v.y - v.height / 2, v.width, v.height))
+
+
+def lane_index(lane, pos):
+    """Returns the index of the first vehicle behind pos in a lane (lanes are ordered downstream first)."""
+    lo, hi = 0, len(lane)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if lane[mid].pos < pos:
+            hi = mid
         else:
-            # Clear to go, apply acceleration
-            self.speed = min(self.max_speed, self.speed + self.accel)
+            lo = mid + 1
+    return lo
+
 
-    def move(self):
-        """Moves the vehicle based on its current speed and direction."""
-        if self.direction == "NORTH": self.y -= self.speed
-        elif self.direction == "SOUTH": self.y += self.speed
-        elif self.direction == "EAST": self.x += self.speed
-        else: self.x -= self.speed
+# --- Signal Drawing ---
+def draw_signal(surface, signal, camera):
+    """Draws a signal pole and its lights."""
+    pygame.draw.rect(surface, (40, 40, 40), camera.rect((signal.x - 12, signal.y - 55, 24, 65)),
+                     border_radius=max(1, int(4 * camera.zoom)))
+    colors = {"RED": (255, 0, 0), "YELLOW": (255, 255, 0), "GREEN": (0, 255, 0), "OFF": (80, 80, 0)}
+    
+    for i, state in enumerate(["RED", "YELLOW", "GREEN"]):
+        color = colors[state] if signal.state == state else \
+                (80, 0, 0) if state == "RED" else \
+                colors["OFF"] if state == "YELLOW" else (0, 80, 0)
+        pygame.draw.circle(surface, color, camera.point(signal.x, signal.y - 40 + i * 18), max(1, 7 * camera.zoom))
 
-    def update(self, signal_state, vehicle_ahead):
-        """Main update call for the vehicle."""
-        self.control_speed(signal_state, vehicle_ahead)
-        self.move()
 
-    def draw(self, surface):
-        """Draws the vehicle on the screen."""
-        rect = self.get_rect()
-        pygame.draw.rect(surface, self.color, rect, border_radius=3)
+# --- VehicleSprites Class ---
+class VehicleSprites:
+    """Pre-rendered vehicle sprites keyed on (type, direction, color, braking, beacon, zoom).
+
+    Each combination (body, brake lights and ambulance beacon) is drawn once
+    on first use; afterwards every vehicle is a single blit of its sprite.
+    """
+
+    COLORKEY = (255, 0, 255)  # Transparent corners of the rounded body
+    BRAKE_LIGHTS = {  # (x, y, w, h) relative to the sprite; w/h <= 0 are offsets from its size
+        "NORTH": (2, -4, -4, 3), "SOUTH": (2, 1, -4, 3),
+        "EAST": (1, 2, 3, -4), "WEST": (-4, 2, 3, -4)
+    }
+
+    def __init__(self):
+        self.sprites = {}
+
+    def get(self, v, beacon, zoom=1):
+        """Returns the sprite for a vehicle; beacon is the current ambulance light color."""
+        key = (v.type, v.direction, v.color, v.speed < 0.1, beacon if v.type == "AMBULANCE" else None, zoom)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = self.render(v.width, v.height, *key)
+        return sprite
+
+    def render(self, width, height, vtype, direction, color, braking, beacon, zoom):
+        """Draws one sprite."""
+        sprite = pygame.Surface((width, height))
+        if pygame.display.get_surface():
+            sprite = sprite.convert()
+        sprite.fill(self.COLORKEY)
+        pygame.draw.rect(sprite, color, (0, 0, width, height), border_radius=3)
         
         # Special drawing for Ambulance
-        if self.type == "AMBULANCE":
-            light_color = (255, 0, 0) if (pygame.time.get_ticks() // 300) % 2 == 0 else (255, 255, 255)
-            pygame.draw.circle(surface, light_color, (int(self.x), int(self.y)), 5)
+        if beacon is not None:
+            pygame.draw.circle(sprite, beacon, (width // 2, height // 2), 5)
         
         # Draw brake lights if stopped
-        if self.speed < 0.1:
-            if self.direction == "NORTH":
-                pygame.draw.rect(surface, (255, 0, 0), (rect.left + 2, rect.bottom - 4, self.width - 4, 3))
-            elif self.direction == "SOUTH":
-                pygame.draw.rect(surface, (255, 0, 0), (rect.left + 2, rect.top + 1, self.width - 4, 3))
-            elif self.direction == "EAST":
-                pygame.draw.rect(surface, (255, 0, 0), (rect.left + 1, rect.top + 2, 3, self.height - 4))
-            else: # WEST
-                pygame.draw.rect(surface, (255, 0, 0), (rect.right - 4, rect.top + 2, 3, self.height - 4))
-
-
-# --- TrafficSignal Class ---
-class TrafficSignal:
-    """Controls a single traffic light."""
-
-    def __init__(self, x, y):
-        self.x, self.y = x, y
-        self.state = "RED"
-        self.vehicles_passed = 0
-        self.vehicles_waiting = 0
+        if braking:
+            x, y, w, h = self.BRAKE_LIGHTS[direction]
+            pygame.draw.rect(sprite, (255, 0, 0), (x % width, y % height,
+                                                   w if w > 0 else width + w, h if h > 0 else height + h))
+        
+        if zoom != 1:
+            sprite = pygame.transform.scale(sprite, (max(1, int(width * zoom)), max(1, int(height * zoom))))
+        sprite.set_colorkey(self.COLORKEY, pygame.RLEACCEL)
+        return sprite
+
+
+def beacon_color():
+    """Returns the ambulance beacon color for the current frame."""
+    return (255, 0, 0) if (pygame.time.get_ticks() // 300) % 2 == 0 else (255, 255, 255)
+
+
+VEHICLE_SPRITES = VehicleSprites()
+
+
+# --- Text Cache ---
+class TextCache:
+    """LRU cache of rendered text surfaces keyed on (font size, string, color)."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.fonts = {}
+        self.entries = OrderedDict()
+
+    def font(self, size):
+        """Returns the default font at the given size, creating it only once."""
+        font = self.fonts.get(size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()  # Offscreen rendering without pygame.init()
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def render(self, size, text, color):
+        """Returns the rendered surface for text, re-rendering only on a cache miss."""
+        key = (size, text, color)
+        rendered = self.entries.get(key)
+        if rendered is not None:
+            self.entries.move_to_end(key)
+            return rendered
+        
+        rendered = self.entries[key] = self.font(size).render(text, True, color)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)  # Evict least recently used
+        return rendered
+
+
+TEXT_CACHE = TextCache()
+
+
+# --- StatsPanel Class ---
+class StatsPanel:
+    """Retained semi-transparent panel that only repaints items whose values changed.
+
+    Items are addressed by key and positioned in panel coordinates. Each set_*
+    call compares against what was last painted and, on a change, clears the
+    old area back to the panel background before painting the new content.
+    """
+
+    BACKGROUND = (0, 0, 0, 180)  # Black with 180/255 transparency
+    BORDER = (100, 100, 255)
+
+    def __init__(self, pos, size, text_cache):
+        self.x, self.y = pos
+        self.width, self.height = size
+        self.text_cache = text_cache
+        self.surface = None
+        self.items = {}  # key -> (value, rect in panel coordinates)
+        self.changed_rects = []  # Panel-coordinate rects repainted since the last draw
+
+    def build(self):
+        """Creates the panel surface with its background and border."""
+        self.surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        self.surface.fill(self.BACKGROUND)
+        pygame.draw.rect(self.surface, self.BORDER, (0, 0, self.width, self.height), 3, border_radius=5)
+        self.items = {}
+        self.changed_rects = [self.surface.get_rect()]
+
+    def _replace(self, key, value):
+        """Returns True if the item must be repainted, clearing its old area."""
+        if self.surface is None:
+            self.build()
+        old = self.items.get(key)
+        if old is not None:
+            if old[0] == value:
+                return False
+            self.surface.fill(self.BACKGROUND, old[1])
+            self.changed_rects.append(old[1])
+        return True
+
+    def _painted(self, key, value, rect):
+        self.items[key] = (value, rect)
+        self.changed_rects.append(rect)
+
+    def set_text(self, key, pos, size, text, color):
+        """Shows a line of text at pos."""
+        value = (pos, size, text, color)
+        if self._replace(key, value):
+            rendered = self.text_cache.render(size, text, color)
+            self._painted(key, value, self.surface.blit(rendered, pos))
+
+    def set_circle(self, key, center, radius, color):
+        """Shows a filled circle (e.g. a signal indicator)."""
+        value = (center, radius, color)
+        if self._replace(key, value):
+            self._painted(key, value, pygame.draw.circle(self.surface, color, center, radius))
+
+    def set_line(self, key, start, end, color, width=2):
+        """Shows a separator line."""
+        value = (start, end, color, width)
+        if self._replace(key, value):
+            self._painted(key, value, pygame.draw.line(self.surface, color, start, end, width))
 
     def draw(self, surface):
-        """Draws the signal pole and lights."""
-        pygame.draw.rect(surface, (40, 40, 40), (self.x - 12, self.y - 55, 24, 65), border_radius=4)
-        colors = {"RED": (255, 0, 0), "YELLOW": (255, 255, 0), "GREEN": (0, 255, 0), "OFF": (80, 80, 0)}
-        
-        for i, state in enumerate(["RED", "YELLOW", "GREEN"]):
-            color = colors[state] if self.state == state else \
-                    (80, 0, 0) if state == "RED" else \
-                    colors["OFF"] if state == "YELLOW" else (0, 80, 0)
-            pygame.draw.circle(surface, color, (self.x, self.y - 40 + i * 18), 7)
+        """Blits the retained panel onto the target surface."""
+        surface.blit(self.surface, (self.x, self.y))
+        self.changed_rects = []
 
 
-# --- Intersection Class ---
-class Intersection:
-    """Manages the entire simulation, including signals, vehicles, and drawing."""
+# --- IntersectionRenderer Class ---
+class IntersectionRenderer:
+    """Draws an Intersection: the cached road layer, signals, vehicles and stats panel.
 
-    def __init__(self):
-        # Lane positions [Lane 0, Lane 1]
-        # (Assuming Right-Hand Traffic)
-        self.lane_positions = {
-            "NORTH": [CENTER_X + LANE_OFFSET_1, CENTER_X + LANE_OFFSET_2], # Right side
-            "SOUTH": [CENTER_X - LANE_OFFSET_1, CENTER_X - LANE_OFFSET_2], # Left side
-            "EAST": [CENTER_Y + LANE_OFFSET_1, CENTER_Y + LANE_OFFSET_2],  # Bottom side
-            "WEST": [CENTER_Y - LANE_OFFSET_1, CENTER_Y - LANE_OFFSET_2]   # Top side
-        }
-        
-        # Signal positions
-        self.signals = {d: TrafficSignal(x, y) for d, (x, y) in {
-            "NORTH": (CENTER_X - ROAD_WIDTH / 2 - 20, CENTER_Y - ROAD_WIDTH / 2),
-            "SOUTH": (CENTER_X + ROAD_WIDTH / 2 + 20, CENTER_Y + ROAD_WIDTH / 2),
-            "EAST": (CENTER_X + ROAD_WIDTH / 2, CENTER_Y - ROAD_WIDTH / 2 - 20),
-            "WEST": (CENTER_X - ROAD_WIDTH / 2, CENTER_Y + ROAD_WIDTH / 2 + 20)
-        }.items()}
-        
-        self.signal_cycle = ["NORTH", "EAST", "SOUTH", "WEST"]
-        self.current_signal_index = 0
-        self.signal_timer = 0
-        self.signal_state = "GREEN"  # Current state (GREEN, YELLOW)
-        self.frame_count = 0
-        
-        # Vehicles stored by [direction][lane_id]
-        self.vehicles = {d: {0: [], 1: []} for d in self.signal_cycle}
-        self.vehicle_id_counter = 0
-        
-        # Statistics
-        self.total_spawned = 0
-        self.total_passed = 0
-        self.spawn_timer = 0
-
-    def spawn_vehicle(self, direction=None):
-        """Spawns a new vehicle in a random lane for a given direction."""
-        direction = direction or random.choice(self.signal_cycle)
-        vtype = random.choices(["AUTO", "CAR", "BIKE", "BUS", "TRUCK", "AMBULANCE"], 
-                               weights=[30, 35, 25, 5, 3, 2])[0]
-        lane_id = random.choice([0, 1])
-        
-        # Get spawn coordinates
-        if direction == "NORTH":
-            x, y = self.lane_positions[direction][lane_id], HEIGHT + 100
-        elif direction == "SOUTH":
-            x, y = self.lane_positions[direction][lane_id], -100
-        elif direction == "EAST":
-            x, y = -100, self.lane_positions[direction][lane_id]
-        else: # WEST
-            x, y = WIDTH + 100, self.lane_positions[direction][lane_id]
-        
-        new_vehicle = Vehicle(self.vehicle_id_counter, x, y, direction, vtype, lane_id)
-        
-        # Check if spawn point is clear (prevent overlapping spawns)
-        if self.vehicles[direction][lane_id]:
-            last_vehicle = self.vehicles[direction][lane_id][-1]
-            if direction == "NORTH" and last_vehicle.y > HEIGHT - 50: return
-            if direction == "SOUTH" and last_vehicle.y < -50: return
-            if direction == "EAST" and last_vehicle.x < -50: return
-            if direction == "WEST" and last_vehicle.x > WIDTH + 50: return
-
-        self.vehicles[direction][lane_id].append(new_vehicle)
-        self.vehicle_id_counter += 1
-        self.total_spawned += 1
-
-    def update_signals(self):
-        """Updates the state of all traffic signals based on timers."""
-        self.frame_count += 1
-        if self.frame_count < FPS:
-            return  # Only update timer once per second
-            
-        self.frame_count = 0
-        self.signal_timer += 1
-        
-        # State machine for signal cycle
-        if self.signal_state == "GREEN" and self.signal_timer >= GREEN_LIGHT_DURATION:
-            self.signal_state = "YELLOW"
-            self.signal_timer = 0
-        elif self.signal_state == "YELLOW" and self.signal_timer >= YELLOW_LIGHT_DURATION:
-            self.signal_state = "GREEN"
-            self.signal_timer = 0
-            # Move to the next direction in the cycle
-            self.current_signal_index = (self.current_signal_index + 1) % len(self.signal_cycle)
-        
-        # Update all signal objects
-        current_green_dir = self.signal_cycle[self.current_signal_index]
-        for d in self.signal_cycle:
-            if d == current_green_dir:
-                self.signals[d].state = self.signal_state
-            else:
-                self.signals[d].state = "RED"
+    Everything in the world is drawn through a Camera. Only the road markings
+    and vehicles inside its viewport are drawn; vehicles are found per lane by
+    binary search on their lane position, so off-screen traffic costs nothing.
+    """
 
-    def update_vehicles(self):
-        """Updates all vehicles on the road."""
-        for direction in self.signal_cycle:
-            signal_state = self.signals[direction].state
-            waiting_count = 0
-            
-            for lane_id in [0, 1]:
-                # Iterate on a copy [:] to allow safe removal
-                for i, v in enumerate(self.vehicles[direction][lane_id][:]):
-                    
-                    # Find the vehicle directly in front
-                    vehicle_ahead = self.vehicles[direction][lane_id][i - 1] if i > 0 else None
-                    
-                    v.update(signal_state, vehicle_ahead)
-                    
-                    if v.speed < 0.1 and not v.passed:
-                        waiting_count += 1
-                    
-                    # Check if vehicle has passed the intersection
-                    if not v.passed:
-                        passed_checks = {
-                            "NORTH": v.y < CENTER_Y - ROAD_WIDTH, "SOUTH": v.y > CENTER_Y + ROAD_WIDTH,
-                            "EAST": v.x > CENTER_X + ROAD_WIDTH, "WEST": v.x < CENTER_X - ROAD_WIDTH
-                        }
-                        if passed_checks[direction]:
-                            v.passed = True
-                            self.total_passed += 1
-                            self.signals[direction].vehicles_passed += 1
-                    
-                    # Remove vehicles that are far off-screen
-                    remove_checks = {
-                        "NORTH": v.y < -200, "SOUTH": v.y > HEIGHT + 200,
-                        "EAST": v.x > WIDTH + 200, "WEST": v.x < -200
-                    }
-                    if remove_checks[direction]:
-                        self.vehicles[direction][lane_id].remove(v)
-                        
-            self.signals[direction].vehicles_waiting = waiting_count
-
-    def update(self):
-        """Main simulation update step."""
-        self.update_signals()
-        self.update_vehicles()
-        
-        # Randomly spawn vehicles
-        self.spawn_timer += 1
-        if self.spawn_timer >= (FPS / SPAWN_RATE_PER_SECOND):
-            self.spawn_timer = 0
-            if random.random() < 0.75: # 75% chance to spawn
-                self.spawn_vehicle()
+    def __init__(self, intersection, screen_size=(WIDTH, HEIGHT)):
+        self.intersection = intersection
+        self.camera = Camera(screen_size, intersection.center)
+
+        # Pre-rendered road layer, rebuilt only when its geometry key changes
+        self.background = None
+        self.background_key = None
+        self.stats_panel = StatsPanel((10, 10), (330, 600), TEXT_CACHE)
+        self.sprites = VEHICLE_SPRITES
+
+        # What was last put on screen, for dirty-rectangle rendering
+        self.drawn_vehicles = None  # id -> (rect, braking)
+        self.drawn_signal_states = {}
+
+    def roads_key(self, surface):
+        """Everything the road layer depends on."""
+        return (surface.get_size(), self.camera.key(), self.intersection.world_size, ROAD_WIDTH, STOP_LINE_OFFSET,
+                COLOR_GRASS, COLOR_ROAD, COLOR_LANE_LINE, COLOR_DASHED_LINE, COLOR_STOP_LINE)
 
     def draw_roads(self, surface):
-        """Draws the grass, roads, and lane markings."""
+        """Blits the cached road layer, rebuilding it if the geometry, camera or window size changed."""
+        key = self.roads_key(surface)
+        if self.background is None or self.background_key != key:
+            self.background = pygame.Surface(surface.get_size())
+            if pygame.display.get_surface():
+                self.background = self.background.convert()
+            self.render_roads(self.background)
+            self.background_key = key
+        surface.blit(self.background, (0, 0))
+
+    def render_roads(self, surface):
+        """Draws the grass, roads, and lane markings seen through the camera."""
+        intersection, camera = self.intersection, self.camera
+        world_width, world_height = intersection.world_size
+        center_x, center_y = intersection.center
+        left, top, right, bottom = camera.viewport()
         surface.fill(COLOR_GRASS)
         
+        def line(color, start, end, width):
+            pygame.draw.line(surface, color, camera.point(*start), camera.point(*end),
+                             max(1, int(width * camera.zoom)))
+        
         # Main road rects
-        road_rect_v = pygame.Rect(CENTER_X - ROAD_WIDTH / 2, 0, ROAD_WIDTH, HEIGHT)
-        road_rect_h = pygame.Rect(0, CENTER_Y - ROAD_WIDTH / 2, WIDTH, ROAD_WIDTH)
-        pygame.draw.rect(surface, COLOR_ROAD, road_rect_v)
-        pygame.draw.rect(surface, COLOR_ROAD, road_rect_h)
+        road_rect_v = pygame.Rect(center_x - ROAD_WIDTH / 2, 0, ROAD_WIDTH, world_height)
+        road_rect_h = pygame.Rect(0, center_y - ROAD_WIDTH / 2, world_width, ROAD_WIDTH)
+        pygame.draw.rect(surface, COLOR_ROAD, camera.rect(road_rect_v))
+        pygame.draw.rect(surface, COLOR_ROAD, camera.rect(road_rect_h))
         
-        # Lane lines (solid edge, dashed center)
+        # Lane lines (solid edge, dashed center); only dashes in view are drawn
         # Vertical road
-        pygame.draw.line(surface, COLOR_LANE_LINE, (road_rect_v.left, 0), (road_rect_v.left, HEIGHT), 2)
-        pygame.draw.line(surface, COLOR_LANE_LINE, (road_rect_v.right, 0), (road_rect_v.right, HEIGHT), 2)
-        for y in range(0, HEIGHT, 40):
-            pygame.draw.line(surface, COLOR_DASHED_LINE, (CENTER_X, y), (CENTER_X, y + 20), 4)
+        line(COLOR_LANE_LINE, (road_rect_v.left, 0), (road_rect_v.left, world_height), 2)
+        line(COLOR_LANE_LINE, (road_rect_v.right, 0), (road_rect_v.right, world_height), 2)
+        for y in range(max(0, int(top) // 40 * 40), min(world_height, int(bottom) + 40), 40):
+            line(COLOR_DASHED_LINE, (center_x, y), (center_x, y + 20), 4)
             
         # Horizontal road
-        pygame.draw.line(surface, COLOR_LANE_LINE, (0, road_rect_h.top), (WIDTH, road_rect_h.top), 2)
-        pygame.draw.line(surface, COLOR_LANE_LINE, (0, road_rect_h.bottom), (WIDTH, road_rect_h.bottom), 2)
-        for x in range(0, WIDTH, 40):
-            pygame.draw.line(surface, COLOR_DASHED_LINE, (x, CENTER_Y), (x + 20, CENTER_Y), 4)
+        line(COLOR_LANE_LINE, (0, road_rect_h.top), (world_width, road_rect_h.top), 2)
+        line(COLOR_LANE_LINE, (0, road_rect_h.bottom), (world_width, road_rect_h.bottom), 2)
+        for x in range(max(0, int(left) // 40 * 40), min(world_width, int(right) + 40), 40):
+            line(COLOR_DASHED_LINE, (x, center_y), (x + 20, center_y), 4)
             
         # Draw Zebra Crossings (Stop Lines)
         crossing_width = ROAD_WIDTH / 2 - 10
@@ -367,114 +346,332 @@ class Intersection:
             x_off = road_rect_v.left + 5 + i * 8
             y_off = road_rect_h.top + 5 + i * 8
             # NORTH
-            pygame.draw.rect(surface, COLOR_STOP_LINE, (x_off, CENTER_Y - STOP_LINE_OFFSET, 4, 15))
+            pygame.draw.rect(surface, COLOR_STOP_LINE, camera.rect((x_off, center_y - STOP_LINE_OFFSET, 4, 15)))
             # SOUTH
-            pygame.draw.rect(surface, COLOR_STOP_LINE, (road_rect_v.right - 5 - 4 - i * 8, CENTER_Y + STOP_LINE_OFFSET - 15, 4, 15))
+            pygame.draw.rect(surface, COLOR_STOP_LINE, camera.rect((road_rect_v.right - 5 - 4 - i * 8, center_y + STOP_LINE_OFFSET - 15, 4, 15)))
             # EAST
-            pygame.draw.rect(surface, COLOR_STOP_LINE, (CENTER_X + STOP_LINE_OFFSET - 15, y_off, 15, 4))
+            pygame.draw.rect(surface, COLOR_STOP_LINE, camera.rect((center_x + STOP_LINE_OFFSET - 15, y_off, 15, 4)))
             # WEST
-            pygame.draw.rect(surface, COLOR_STOP_LINE, (CENTER_X - STOP_LINE_OFFSET, road_rect_h.bottom - 5 - 4 - i * 8, 15, 4))
+            pygame.draw.rect(surface, COLOR_STOP_LINE, camera.rect((center_x - STOP_LINE_OFFSET, road_rect_h.bottom - 5 - 4 - i * 8, 15, 4)))
 
     def draw_ui(self, surface):
         """Draws the statistics and info panel."""
-        px, py, pw = 10, 10, 330
-        
-        # Create a semi-transparent surface
-        ui_panel = pygame.Surface((pw, 600), pygame.SRCALPHA)
-        ui_panel.fill((0, 0, 0, 180))  # Black with 180/255 transparency
-        surface.blit(ui_panel, (px, py))
-        
-        # Border
-        pygame.draw.rect(surface, (100, 100, 255), (px, py, pw, 600), 3, border_radius=5)
-        
-        # Fonts
-        font_title = pygame.font.Font(None, 32)
-        font_norm = pygame.font.Font(None, 24)
-        font_small = pygame.font.Font(None, 20)
+        self.update_ui()
+        self.stats_panel.draw(surface)
+
+    def update_ui(self):
+        """Brings the retained statistics panel up to date with the simulation."""
+        intersection = self.intersection
+        panel = self.stats_panel
+        pw = panel.width
         
         # Title
-        surface.blit(font_title.render("TRAFFIC CONTROL", True, (255, 255, 255)), (px + 50, py + 15))
-        
-        y = py + 55
-        current_green = self.signal_cycle[self.current_signal_index]
-        time_left = (GREEN_LIGHT_DURATION if self.signal_state == "GREEN" else YELLOW_LIGHT_DURATION) - self.signal_timer
-        
-        for text, color in [
-            (f"Time: {datetime.now().strftime('%H:%M:%S')}", (200, 200, 200)),
-            (f"Green: {current_green}", (0, 255, 0)),
-            (f"Timer: {time_left}s", (255, 200, 0))
+        panel.set_text("title", (50, 15), 32, "TRAFFIC CONTROL", (255, 255, 255))
+        
+        y = 55
+        current_green = intersection.signal_cycle[intersection.current_signal_index]
+        time_left = (intersection.green_duration if intersection.signal_state == "GREEN" else intersection.yellow_duration) - intersection.signal_timer
+        
+        sim_seconds = int(intersection.sim_time)
+        sim_clock = f"{sim_seconds // 3600:02d}:{sim_seconds // 60 % 60:02d}:{sim_seconds % 60:02d}"
+        for key, text, color in [
+            ("clock", f"Time: {datetime.now().strftime('%H:%M:%S')}", (200, 200, 200)),
+            ("sim_clock", f"Sim: {sim_clock}", (200, 200, 200)),
+            ("green", f"Green: {current_green}", (0, 255, 0)),
+            ("timer", f"Timer: {time_left}s", (255, 200, 0))
         ]:
-            font = font_small if color == (200, 200, 200) else font_norm
-            surface.blit(font.render(text, True, color), (px + 20, y))
+            size = 20 if color == (200, 200, 200) else 24
+            panel.set_text(key, (20, y), size, text, color)
             y += 25 if color == (200, 200, 200) else 30
         
         y += 10
-        pygame.draw.line(surface, (100, 100, 255), (px + 10, y), (px + pw - 10, y), 2)
+        panel.set_line("sep_signals", (10, y), (pw - 10, y), (100, 100, 255))
         y += 15
         
         # Per-direction stats
-        for direction in self.signal_cycle:
-            signal = self.signals[direction]
+        for direction in intersection.signal_cycle:
+            signal = intersection.signals[direction]
             color = (0, 255, 0) if signal.state == "GREEN" else \
                     (255, 255, 0) if signal.state == "YELLOW" else (255, 0, 0)
             
-            surface.blit(font_norm.render(direction, True, (255, 255, 255)), (px + 20, y))
-            pygame.draw.circle(surface, color, (px + 130, y + 10), 8)
+            panel.set_text(direction, (20, y), 24, direction, (255, 255, 255))
+            panel.set_circle(direction + "_light", (130, y + 10), 8, color)
             
-            queue_len = len(self.vehicles[direction][0]) + len(self.vehicles[direction][1])
-            surface.blit(font_small.render(f"Q:{queue_len}", True, (200, 200, 200)), (px + 20, y + 25))
+            queue_len = len(intersection.vehicles[direction][0]) + len(intersection.vehicles[direction][1])
+            panel.set_text(direction + "_queue", (20, y + 25), 20, f"Q:{queue_len}", (200, 200, 200))
             
             stat_text = f"P:{signal.vehicles_passed}" if signal.state == "GREEN" else f"W:{signal.vehicles_waiting}"
             stat_color = (0, 255, 0) if signal.state == "GREEN" else (255, 100, 100)
-            surface.blit(font_small.render(stat_text, True, stat_color), (px + 170, y + 25))
+            panel.set_text(direction + "_stat", (170, y + 25), 20, stat_text, stat_color)
             y += 55
         
-        pygame.draw.line(surface, (100, 100, 255), (px + 10, y), (px + pw - 10, y), 2)
+        panel.set_line("sep_stats", (10, y), (pw - 10, y), (100, 100, 255))
         y += 20
-        surface.blit(font_norm.render("STATISTICS", True, (255, 255, 0)), (px + 90, y))
+        panel.set_text("stats_title", (90, y), 24, "STATISTICS", (255, 255, 0))
         y += 30
         
         # Global stats
-        current_total = sum(len(l) for d in self.vehicles.values() for l in d.values())
-        for stat in [
-            f"Spawned: {self.total_spawned}",
-            f"Passed: {self.total_passed}",
-            f"Current: {current_total}"
+        current_total = sum(len(l) for d in intersection.vehicles.values() for l in d.values())
+        for key, stat in [
+            ("spawned", f"Spawned: {intersection.total_spawned}"),
+            ("passed", f"Passed: {intersection.total_passed}"),
+            ("current", f"Current: {current_total}")
         ]:
-            surface.blit(font_small.render(stat, True, (200, 200, 200)), (px + 20, y))
+            panel.set_text(key, (20, y), 20, stat, (200, 200, 200))
             y += 25
             
         y += 15
-        pygame.draw.line(surface, (100, 100, 255), (px + 10, y), (px + pw - 10, y), 2)
+        panel.set_line("sep_help", (10, y), (pw - 10, y), (100, 100, 255))
         y += 15
-        surface.blit(font_small.render("SPACE-Random | N/S/E/W-Dir", True, (180, 180, 180)), (px + 20, y))
+        panel.set_text("help", (20, y), 20, "SPACE-Random | N/S/E/W-Dir | 1/2/3-Speed", (180, 180, 180))
+
+    def visible_vehicles(self):
+        """Returns the vehicles that may overlap the viewport."""
+        intersection = self.intersection
+        left, top, right, bottom = self.camera.viewport()
+        visible = []
+        for direction, lanes in intersection.vehicles.items():
+            for lane_id, lane in lanes.items():
+                geometry = intersection.lane_geometry[direction][lane_id]
+                cross_lo, cross_hi, lo, hi = (left, right, top, bottom) if geometry.vertical else \
+                                             (top, bottom, left, right)
+                if not cross_lo - VEHICLE_MARGIN < geometry.cross < cross_hi + VEHICLE_MARGIN:
+                    continue
+                
+                # Viewport extent as lane positions; lanes are sorted by descending pos
+                first, last = sorted((geometry.sign * (lo - VEHICLE_MARGIN), geometry.sign * (hi + VEHICLE_MARGIN)))
+                start, stop = lane_index(lane, last), lane_index(lane, first)
+                visible.extend(lane[i] for i in range(start, stop))
+        return visible
+
+    def draw_vehicles(self, surface):
+        """Draws every vehicle in view."""
+        camera = self.camera
+        sprites, beacon, zoom = self.sprites, beacon_color(), camera.zoom
+        surface.blits([
+            (sprites.get(v, beacon, zoom), camera.point(v.x - v.width / 2, v.y - v.height / 2))
+            for v in self.visible_vehicles()
+        ], False)
 
     def draw(self, surface):
         """Main draw call for the entire simulation."""
+        intersection = self.intersection
         self.draw_roads(surface)
         
-        for signal in self.signals.values():
-            signal.draw(surface)
+        for signal in intersection.signals.values():
+            draw_signal(surface, signal, self.camera)
             
-        for direction_lanes in self.vehicles.values():
-            for lane_vehicles in direction_lanes.values():
-                for v in lane_vehicles:
-                    v.draw(surface)
-                    
+        self.draw_vehicles(surface)
         self.draw_ui(surface)
 
+    def draw_dirty(self, surface):
+        """Redraws only the regions that changed since the last call.
+
+        Returns the list of changed rects to pass to pygame.display.update().
+        The first call (or a window resize or camera move) falls back to a full redraw.
+        """
+        intersection, camera = self.intersection, self.camera
+        vehicles = self.visible_vehicles()
+        
+        if self.drawn_vehicles is None or self.background_key != self.roads_key(surface):
+            self.draw(surface)
+            self.drawn_vehicles = {v.id: (camera.vehicle_rect(v), v.speed < 0.1) for v in vehicles}
+            self.drawn_signal_states = {d: s.state for d, s in intersection.signals.items()}
+            return [surface.get_rect()]
+        
+        dirty = []
+        
+        # Vehicles: old and new rect of anything that moved, changed brake lights or flashes
+        drawn = {}
+        vehicle_rects = []
+        for v in vehicles:
+            rect, braking = camera.vehicle_rect(v), v.speed < 0.1
+            old = self.drawn_vehicles.pop(v.id, None)
+            if old is None:
+                dirty.append(rect)
+            elif old[0] != rect or old[1] != braking or v.type == "AMBULANCE":
+                dirty.append(old[0])
+                dirty.append(rect)
+            drawn[v.id] = (rect, braking)
+            vehicle_rects.append(rect)
+        dirty.extend(rect for rect, _ in self.drawn_vehicles.values())  # Departed vehicles
+        self.drawn_vehicles = drawn
+        
+        # Signal heads whose state changed
+        signal_rects = {d: camera.rect((s.x - 12, s.y - 55, 24, 65)) for d, s in intersection.signals.items()}
+        for d, signal in intersection.signals.items():
+            if self.drawn_signal_states.get(d) != signal.state:
+                dirty.append(signal_rects[d])
+                self.drawn_signal_states[d] = signal.state
+        
+        # Panel items whose values changed
+        panel = self.stats_panel
+        self.update_ui()
+        dirty.extend(r.move(panel.x, panel.y) for r in panel.changed_rects)
+        panel.changed_rects = []
+        
+        if not dirty:
+            return []
+        
+        # Merge overlapping areas so that every pixel is repainted exactly once;
+        # the panel is translucent and must not be composited twice.
+        merged = []
+        for rect in dirty:
+            rect = pygame.Rect(rect)
+            i = rect.collidelist(merged)
+            while i != -1:
+                rect.union_ip(merged.pop(i))
+                i = rect.collidelist(merged)
+            merged.append(rect)
+        
+        panel_rect = pygame.Rect(panel.x, panel.y, panel.width, panel.height)
+        beacon = beacon_color()
+        for area in merged:
+            surface.set_clip(area)
+            surface.blit(self.background, area, area)
+            for d, signal in intersection.signals.items():
+                if signal_rects[d].colliderect(area):
+                    draw_signal(surface, signal, camera)
+            surface.blits([
+                (self.sprites.get(v, beacon, camera.zoom), rect)
+                for v, rect in zip(vehicles, vehicle_rects) if rect.colliderect(area)
+            ], False)
+            if panel_rect.colliderect(area):
+                panel.draw(surface)
+        surface.set_clip(None)
+        
+        return merged
+
+
+# --- Profiler Class ---
+class Profiler:
+    """Rolling per-phase timings of the main loop and the simulation hot path.
+
+    While enabled, the phase methods of the intersection and its renderer are
+    shadowed by timed wrappers on the instances; disabling deletes the
+    wrappers again, so with profiling off update() and draw() run the plain
+    methods untouched.
+    """
+
+    PHASES = ["frame", "events", "update_signals", "update_vehicles", "spawn",
+              "draw_roads", "draw_vehicles", "draw_ui", "flip"]
+    SIM_PHASES = {"update_signals": "update_signals", "update_vehicles": "update_vehicles",
+                  "spawn_vehicle": "spawn"}
+    RENDER_PHASES = {"draw_roads": "draw_roads", "draw_vehicles": "draw_vehicles", "draw_ui": "draw_ui"}
+
+    def __init__(self, window=600):
+        self.samples = {phase: deque(maxlen=window) for phase in self.PHASES}  # Seconds per call
+        self.enabled = False
+        self.targets = []  # (instance, {method: phase}) currently wrapped
+        self.overlay = None
+        self.overlay_frames = 0  # Frames since the overlay text was last rendered
+
+    def enable(self, intersection, renderer):
+        """Starts timing the phases of an intersection and its renderer."""
+        self.disable()
+        self.targets = [(intersection, self.SIM_PHASES), (renderer, self.RENDER_PHASES)]
+        for target, phases in self.targets:
+            for method, phase in phases.items():
+                setattr(target, method, self.timed(phase, getattr(target, method)))
+        self.enabled = True
+
+    def disable(self):
+        """Removes the timed wrappers; collected samples are kept."""
+        for target, phases in self.targets:
+            for method in phases:
+                delattr(target, method)
+        self.targets = []
+        self.enabled = False
+
+    def toggle(self, intersection, renderer):
+        """Switches profiling (and the overlay) on or off."""
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable(intersection, renderer)
+
+    def timed(self, phase, method):
+        """Wraps a bound method so that every call is recorded under phase."""
+        samples = self.samples[phase]
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = method(*args, **kwargs)
+            samples.append(time.perf_counter() - start)
+            return result
+        return wrapper
+
+    def record(self, phase, start):
+        """Records the time since start under phase and returns the current time."""
+        now = time.perf_counter()
+        self.samples[phase].append(now - start)
+        return now
+
+    def percentiles(self, percents=(50, 95, 99)):
+        """Returns {phase: {"calls": n, "p50": ms, ...}} over the rolling window."""
+        stats = {}
+        for phase, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            stats[phase] = {"calls": len(ordered)}
+            for p in percents:
+                index = min(len(ordered) - 1, len(ordered) * p // 100)
+                stats[phase][f"p{p}"] = ordered[index] * 1000
+            stats[phase]["max"] = ordered[-1] * 1000
+        return stats
+
+    def dump(self, path=None):
+        """Writes the percentiles and raw samples (in ms) to a JSON file; returns its path."""
+        path = path or f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(path, "w") as f:
+            json.dump({
+                "percentiles": self.percentiles(),
+                "samples": {phase: [t * 1000 for t in samples] for phase, samples in self.samples.items()}
+            }, f, indent=2)
+        return path
+
+    def draw_overlay(self, surface):
+        """Draws the p50/p95/p99 table in the top-right corner."""
+        # Text changes every frame, so it is re-rendered a few times per second only
+        if self.overlay is None or self.overlay_frames >= FPS // 4:
+            font = TEXT_CACHE.font(18)
+            rows = [["phase", "p50 ms", "p95 ms", "p99 ms"]]
+            rows += [[phase] + [f"{s[p]:.3f}" for p in ("p50", "p95", "p99")]
+                     for phase, s in self.percentiles().items()]
+            rows.append(["F3-Hide | F4-Dump"])
+            self.overlay = pygame.Surface((340, 10 + 18 * len(rows)), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 180))
+            for i, row in enumerate(rows):
+                for j, text in enumerate(row):
+                    image = font.render(text, True, (255, 255, 255))
+                    # Phase names are left-aligned, numbers right-aligned in 60px columns
+                    x = 10 if j == 0 else 130 + 65 * j - image.get_width()
+                    self.overlay.blit(image, (x, 5 + 18 * i))
+            self.overlay_frames = 0
+        self.overlay_frames += 1
+        surface.blit(self.overlay, (surface.get_width() - self.overlay.get_width() - 10, 10))
+
 
 # --- Main Function ---
-def main():
+def main(dirty_rects=False, intersection=None, observers=(), threaded=False):
+    pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Indian Traffic Signal Simulation (Enhanced)")
     clock = pygame.time.Clock()
+    sim_clock = SimClock()
+    profiler = Profiler()
     
-    intersection = Intersection()
+    intersection = intersection or Intersection()
+    renderer = IntersectionRenderer(intersection)
+    # Threaded: the simulation steps on its own thread and frames draw its latest snapshot
+    sim_thread = SimThread(intersection, observers) if threaded else None
     running = True
     
     while running:
-        clock.tick(FPS)
+        frame_ms = clock.tick(FPS)
+        start = time.perf_counter()
+        if profiler.enabled:
+            profiler.samples["frame"].append(frame_ms / 1000)
         
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -485,14 +682,103 @@ def main():
                     pygame.K_e: "EAST", pygame.K_w: "WEST"
                 }
                 if event.key in key_map:
-                    intersection.spawn_vehicle(key_map[event.key])
-        
-        intersection.update()
-        intersection.draw(screen)
-        pygame.display.flip()
+                    if sim_thread is not None:
+                        sim_thread.send("spawn", key_map[event.key])
+                    else:
+                        intersection.spawn_vehicle(key_map[event.key])
+                elif event.key in (pygame.K_1, pygame.K_2, pygame.K_3):
+                    time_scale = SimClock.TIME_SCALES[event.key - pygame.K_1]
+                    if sim_thread is not None:
+                        sim_thread.send("time_scale", time_scale)
+                    else:
+                        sim_clock.time_scale = time_scale
+                    pygame.display.set_caption(f"Indian Traffic Signal Simulation (Enhanced) - {time_scale}x")
+                elif event.key == pygame.K_F3:
+                    profiler.toggle(intersection, renderer)
+                    renderer.drawn_vehicles = None  # Repaint fully once the overlay is gone
+                elif event.key == pygame.K_F4:
+                    print(f"Profile written to {profiler.dump()}")
+                elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                    renderer.camera.zoom_by(1)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    renderer.camera.zoom_by(-1)
+                elif event.key == pygame.K_HOME:
+                    renderer.camera.center_on(*intersection.center)
+            elif event.type == pygame.MOUSEWHEEL:
+                renderer.camera.zoom_by(1 if event.y > 0 else -1)
+        
+        # Arrow keys pan the camera while held
+        keys = pygame.key.get_pressed()
+        pan = PAN_SPEED * frame_ms / 1000
+        renderer.camera.pan((keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]) * pan,
+                            (keys[pygame.K_DOWN] - keys[pygame.K_UP]) * pan)
+        if profiler.enabled:
+            profiler.record("events", start)
+        
+        if sim_thread is not None:
+            renderer.intersection = sim_thread.snapshot
+        else:
+            for _ in range(sim_clock.advance(frame_ms / 1000)):
+                intersection.update()
+                for observer in observers:
+                    observer(intersection)
+        
+        if not profiler.enabled:
+            if dirty_rects:
+                pygame.display.update(renderer.draw_dirty(screen))
+            else:
+                renderer.draw(screen)
+                pygame.display.flip()
+        else:
+            # The overlay is not tracked by draw_dirty, so frames are drawn in full while it is up
+            renderer.draw(screen)
+            profiler.draw_overlay(screen)
+            start = time.perf_counter()
+            pygame.display.flip()
+            profiler.record("flip", start)
     
+    if sim_thread is not None:
+        sim_thread.stop()
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Traffic signal simulation")
+    parser.add_argument("--headless", type=float, metavar="SECONDS",
+                        help="run SECONDS of simulated time without a window and print the statistics")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only push the screen regions that changed instead of flipping full frames")
+    parser.add_argument("--threaded", action="store_true",
+                        help="step the simulation on its own thread and draw its latest snapshot each frame")
+    parser.add_argument("--demand", choices=DEMAND_PROFILES,
+                        help="spawn Poisson arrivals from a pre-drawn schedule following this demand profile")
+    parser.add_argument("--conflicts", action="store_true",
+                        help="make vehicles in the junction box yield to crossing traffic")
+    parser.add_argument("--world", type=int, nargs=2, metavar=("W", "H"), default=(WIDTH, HEIGHT),
+                        help="world size in pixels; the intersection sits in the middle (default: the window size)")
+    parser.add_argument("--spawn-rate", type=float, default=SPAWN_RATE_PER_SECOND,
+                        help="mean vehicles spawned per simulated second")
+    parser.add_argument("--seed", type=int, help="seed for reproducible runs")
+    parser.add_argument("--restore", metavar="PATH",
+                        help="continue from a checkpoint (see checkpoint.py) instead of an empty intersection")
+    args = parser.parse_args()
+
+    if args.restore:
+        intersection = checkpoint.load(args.restore)
+    else:
+        schedule = None
+        if args.demand:
+            schedule = SpawnSchedule(args.spawn_rate, ["NORTH", "EAST", "SOUTH", "WEST"],
+                                     VEHICLE_TYPE_WEIGHTS, DEMAND_PROFILES[args.demand], args.seed)
+        intersection = Intersection(spawn_rate=args.spawn_rate, seed=args.seed, schedule=schedule,
+                                    junction_conflicts=args.conflicts, world_size=tuple(args.world))
+
+    if args.headless is not None:
+        stats = run_headless(args.headless, intersection)
+        print(f"Spawned: {stats['total_spawned']}  Passed: {stats['total_passed']}  Current: {stats['current']}")
+        print(f"Mean queue: {stats['mean_queue']:.2f}  Max wait: {stats['max_wait']:.1f}s")
+        for direction, signal_stats in stats["signals"].items():
+            print(f"{direction:<6} P:{signal_stats['vehicles_passed']}  W:{signal_stats['vehicles_waiting']}")
+    else:
+        main(dirty_rects=args.dirty_rects, intersection=intersection, threaded=args.threaded)
+
 
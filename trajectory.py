@@ -0,0 +1,253 @@
+"""Compact binary trajectory recorder and memory-mapped replay.
+
+A trajectory file is a small header followed by one frame per recorded step.
+Each frame is a fixed-size FRAME record (step, counters and signal states)
+followed by `vehicle_count` fixed-size VEHICLE records:
+
+    header  : magic "TRJ1", version, stride, world width, world height
+    frame   : step, vehicle_count, total_spawned, total_passed,
+              current_signal_index, signal_state, signal_timer,
+              per-signal state / vehicles_passed / vehicles_waiting
+    vehicle : id, type, direction, lane, color (r, g, b), x, y, speed
+
+Replay memory-maps the file, indexes the frame offsets once and rebuilds the
+Intersection state for any frame directly from the mapped bytes, so a run can
+be scrubbed back and forth without re-running update() or spawn_vehicle().
+
+Usage:
+    python trajectory.py record run.trj                    # record a windowed run
+    python trajectory.py record run.trj --headless 3600    # record without a window
+    python trajectory.py replay run.trj
+"""
+import argparse
+import mmap
+import struct
+
+import pygame
+
+from traffic_sim import Intersection, Vehicle, VEHICLE_SPECS, WIDTH, HEIGHT, PHYSICS_HZ, run_headless
+from traffic_visualiser import FPS, IntersectionRenderer, main
+
+MAGIC = b"TRJ1"
+VERSION = 2
+
+HEADER = struct.Struct("<4sHHII")
+FRAME = struct.Struct("<IIIIBBH4B4I4H")
+VEHICLE = struct.Struct("<QBBB3Bxxfff")
+
+DIRECTIONS = ["NORTH", "EAST", "SOUTH", "WEST"]
+VEHICLE_TYPES = list(VEHICLE_SPECS)
+SIGNAL_STATES = ["RED", "YELLOW", "GREEN"]
+
+
+# --- TrajectoryRecorder Class ---
+class TrajectoryRecorder:
+    """Appends the state of every `stride`-th simulation step to a trajectory file.
+
+    Use as an observer: run_headless(..., observers=[recorder.record]).
+    """
+
+    def __init__(self, path, stride=1, world_size=(WIDTH, HEIGHT)):
+        self.stride = stride
+        self.file = open(path, "wb", buffering=1 << 20)
+        self.file.write(HEADER.pack(MAGIC, VERSION, stride, *world_size))
+        self.frames = 0
+
+    def record(self, intersection):
+        """Writes the current state of the intersection as one frame."""
+        if intersection.step_count % self.stride:
+            return
+
+        vehicles = [v for d in DIRECTIONS for lane in intersection.vehicles[d].values() for v in lane]
+        buffer = bytearray(FRAME.size + VEHICLE.size * len(vehicles))
+        signals = [intersection.signals[d] for d in DIRECTIONS]
+        FRAME.pack_into(
+            buffer, 0, intersection.step_count, len(vehicles),
+            intersection.total_spawned, intersection.total_passed,
+            intersection.current_signal_index, SIGNAL_STATES.index(intersection.signal_state),
+            intersection.signal_timer,
+            *[SIGNAL_STATES.index(s.state) for s in signals],
+            *[s.vehicles_passed for s in signals],
+            *[s.vehicles_waiting for s in signals]
+        )
+
+        offset = FRAME.size
+        for v in vehicles:
+            VEHICLE.pack_into(
+                buffer, offset, v.id, VEHICLE_TYPES.index(v.type), DIRECTIONS.index(v.direction),
+                v.lane, *v.color, v.x, v.y, v.speed
+            )
+            offset += VEHICLE.size
+
+        self.file.write(buffer)
+        self.frames += 1
+
+    def close(self):
+        """Flushes and closes the trajectory file."""
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- TrajectoryReplay Class ---
+class TrajectoryReplay:
+    """Random access to the frames of a memory-mapped trajectory file."""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.stride, *world_size = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} trajectory file")
+        self.world_size = tuple(world_size)  # Of the recorded intersection, so lanes line up on replay
+
+        # Index frame offsets; only the fixed-size frame records are read
+        self.offsets = []
+        offset, size = HEADER.size, len(self.map)
+        while offset + FRAME.size <= size:
+            vehicle_count = FRAME.unpack_from(self.map, offset)[1]
+            if offset + FRAME.size + vehicle_count * VEHICLE.size > size:
+                break  # Truncated last frame (recording was interrupted)
+            self.offsets.append(offset)
+            offset += FRAME.size + vehicle_count * VEHICLE.size
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def load(self, index, intersection):
+        """Overwrites the intersection's state with frame `index`."""
+        offset = self.offsets[index]
+        frame = FRAME.unpack_from(self.map, offset)
+        (step, vehicle_count, intersection.total_spawned, intersection.total_passed,
+         intersection.current_signal_index, signal_state, intersection.signal_timer) = frame[:7]
+        intersection.step_count = step
+        intersection.signal_state = SIGNAL_STATES[signal_state]
+        for i, d in enumerate(DIRECTIONS):
+            signal = intersection.signals[d]
+            signal.state = SIGNAL_STATES[frame[7 + i]]
+            signal.vehicles_passed = frame[11 + i]
+            signal.vehicles_waiting = frame[15 + i]
+
+        for lanes in intersection.vehicles.values():
+            for lane in lanes.values():
+                lane.clear()
+
+        start = offset + FRAME.size
+        with memoryview(self.map)[start:start + vehicle_count * VEHICLE.size] as records:
+            self.load_vehicles(records, intersection)
+
+    def load_vehicles(self, records, intersection):
+        """Rebuilds the lane queues from a buffer of VEHICLE records."""
+        for vid, vtype, direction, lane_id, r, g, b, x, y, speed in VEHICLE.iter_unpack(records):
+            geometry = intersection.lane_geometry[DIRECTIONS[direction]][lane_id]
+            v = Vehicle.__new__(Vehicle)
+            v.id, v.geometry, v.type = vid, geometry, VEHICLE_TYPES[vtype]
+            v.direction, v.lane = geometry.direction, lane_id
+            v.pos = geometry.sign * (y if geometry.vertical else x)
+            v.passed, v.wait_steps = v.pos > geometry.pass_pos, 0
+            v.vehicle_width, v.length = VEHICLE_SPECS[v.type]["size"]
+            v.color = (r, g, b)
+            v.max_speed, v.accel, v.decel = VEHICLE_SPECS[v.type]["speed"]
+            v.speed = speed
+            if geometry.vertical:
+                v.width, v.height = v.vehicle_width, v.length
+            else:
+                v.width, v.height = v.length, v.vehicle_width
+            intersection.vehicles[v.direction][lane_id].append(v)
+
+    def close(self):
+        """Unmaps and closes the trajectory file."""
+        self.map.close()
+        self.file.close()
+
+
+def replay(path):
+    """Plays back a trajectory file in a window.
+
+    SPACE pauses, LEFT/RIGHT seek 5 seconds, ,/. step one frame while paused,
+    HOME/END jump to the start/end and 1/2/3 set the playback speed.
+    """
+    trajectory = TrajectoryReplay(path)
+    if not len(trajectory):
+        print(f"{path} contains no frames")
+        return
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    clock = pygame.time.Clock()
+    intersection = Intersection(world_size=trajectory.world_size)
+    renderer = IntersectionRenderer(intersection)
+    frames_per_second = PHYSICS_HZ / trajectory.stride
+    position, speed, paused = 0.0, 1, False
+    running = True
+
+    while running:
+        frame_ms = clock.tick(FPS)
+        last = len(trajectory) - 1
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_LEFT:
+                    position -= 5 * frames_per_second
+                elif event.key == pygame.K_RIGHT:
+                    position += 5 * frames_per_second
+                elif event.key == pygame.K_COMMA:
+                    position -= 1
+                elif event.key == pygame.K_PERIOD:
+                    position += 1
+                elif event.key == pygame.K_HOME:
+                    position = 0
+                elif event.key == pygame.K_END:
+                    position = last
+                elif event.key in (pygame.K_1, pygame.K_2, pygame.K_3):
+                    speed = [1, 10, 100][event.key - pygame.K_1]
+
+        if not paused:
+            position += frame_ms / 1000 * frames_per_second * speed
+        position = min(max(position, 0), last)
+
+        trajectory.load(int(position), intersection)
+        pygame.display.set_caption(
+            f"Replay {path} - frame {int(position) + 1}/{len(trajectory)} - "
+            f"{'paused' if paused else f'{speed}x'}")
+        renderer.draw(screen)
+        pygame.display.flip()
+
+    trajectory.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or replay simulation trajectories")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="record a run to a trajectory file")
+    record_parser.add_argument("path")
+    record_parser.add_argument("--headless", type=float, metavar="SECONDS",
+                               help="record SECONDS of simulated time without a window")
+    record_parser.add_argument("--stride", type=int, default=1, help="record every Nth step")
+    record_parser.add_argument("--world", type=int, nargs=2, metavar=("W", "H"), default=(WIDTH, HEIGHT),
+                               help="world size in pixels (default: the window size)")
+    record_parser.add_argument("--seed", type=int)
+    replay_parser = commands.add_parser("replay", help="play back a trajectory file")
+    replay_parser.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        intersection = Intersection(seed=args.seed, world_size=tuple(args.world))
+        with TrajectoryRecorder(args.path, args.stride, intersection.world_size) as recorder:
+            if args.headless is not None:
+                run_headless(args.headless, intersection, observers=[recorder.record])
+            else:
+                main(intersection=intersection, observers=[recorder.record])
+        print(f"Recorded {recorder.frames} frames to {args.path}")
+    else:
+        replay(args.path)